@@ -11,7 +11,7 @@ from lexcatter import supersenses_for_lexcat, ALL_LEXCATS
 from mwerender import render, render_sent
 from streuseval import parse_mwe_links, form_groups
 from supersenses import ancestors
-from tagging import sent_tags
+from tagging import sent_tags, summarize_report
 
 desc = \
 """
@@ -26,7 +26,7 @@ See conllulex2UDlextag.py for an explanation of the .UDlextag format.
 @since: 2019-06-20
 """
 
-def load_sents(inF, morph_syn=True, misc=True, ss_mapper=None, validate_pos=True, validate_type=True):
+def load_sents(inF, morph_syn=True, misc=True, ss_mapper=None, validate_pos=True, validate_type=True, verbose=False):
     """Given a .UDlextag file (or iterable over lines), return an iterator over sentences.
 
     @param morph_syn: Whether to include CoNLL-U morphological features
@@ -38,9 +38,12 @@ def load_sents(inF, morph_syn=True, misc=True, ss_mapper=None, validate_pos=True
     verbs, prepositions). Not applied if the supersense slot is empty.
     @param validate_pos: Validate consistency of lextag with UPOS
     @param validate_type: Validate SWE-specific or SMWE-specific tags only apply to the corresponding MWE type
+    @param verbose: In the summary of MWE analyses simplified for the lextags, list each simplified group
+    and the sentence it occurs in (see tagging.summarize_report())
     """
 
     lc_tbd = 0
+    report = [] # simplifications of MWE analyses in the lextags (see tagging.sent_tags())
 
     def _unpack_lextags(sent):
         """At this point the sentence will be a collection of tokens, which will have
@@ -224,7 +227,7 @@ def load_sents(inF, morph_syn=True, misc=True, ss_mapper=None, validate_pos=True
         wmweGroups = [wmwe['toknums'] for wmwe in sent['wmwes'].values()]
         if 'mwe' not in sent:
             sent['mwe'] = render_sent(sent, False, False)
-        tagging = sent_tags(len(sent['toks']), sent['mwe'], smweGroups, wmweGroups)
+        tagging = sent_tags(len(sent['toks']), sent['mwe'], smweGroups, wmweGroups, report)
         for tok,tag in zip(sent['toks'],tagging):
             fulllextag = tag
             if tok['smwe']:
@@ -387,6 +390,9 @@ def load_sents(inF, morph_syn=True, misc=True, ss_mapper=None, validate_pos=True
             else:
                 sent['toks'].append(tok)
 
+    if report:
+        summarize_report(report, verbose)
+
     if lc_tbd>0:
         print('Tokens with lexcat TBD:', lc_tbd, file=sys.stderr)
         assert False,'PLACEHOLDER LEXCATS ARE DISALLOWED'
@@ -398,6 +404,7 @@ if __name__=='__main__':
     argparser.add_argument("--no-misc", action="store_false", dest="misc")
     argparser.add_argument("--no-validate-pos", action="store_false", dest="validate_pos")
     argparser.add_argument("--no-validate-type", action="store_false", dest="validate_type")
+    argparser.add_argument("-v", "--verbose", action="store_true")
     args = argparser.parse_args()
 
     print('[')
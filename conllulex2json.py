@@ -11,7 +11,7 @@ from typing import Literal
 from lexcatter import supersenses_for_lexcat, ALL_LEXCATS
 from mwerender import render
 from supersenses import ancestors, makesslabel
-from tagging import sent_tags
+from tagging import sent_tags, summarize_report
 
 desc = \
 """
@@ -28,7 +28,7 @@ Also performs validation checks on the input.
 
 def load_sents(inF, morph_syn=True, misc=True, ss_mapper=None,
                store_conllulex: Literal[False, 'full', 'toks'] = False,
-               validate_pos=True, validate_type=True):
+               validate_pos=True, validate_type=True, verbose=False):
     """Given a .conllulex or .json file, return an iterator over sentences.
     If a .conllulex file, performs consistency checks.
 
@@ -45,6 +45,8 @@ def load_sents(inF, morph_syn=True, misc=True, ss_mapper=None,
     @param validate_pos: Validate consistency of lextag with UPOS
     @param validate_type: Validate SWE-specific or SMWE-specific tags only apply to the corresponding MWE type
     Has no effect if input is JSON.
+    @param verbose: In the summary of MWE analyses simplified for the lextags, list each simplified group
+    and the sentence it occurs in (see tagging.summarize_report())
     """
     if store_conllulex: assert store_conllulex in {'full', 'toks'}
 
@@ -81,6 +83,7 @@ def load_sents(inF, morph_syn=True, misc=True, ss_mapper=None,
     # Otherwise, .conllulex: create data structures and check consistency
 
     lc_tbd = 0
+    report = [] # simplifications of MWE analyses in the lextags (see tagging.sent_tags())
 
     def _postproc_sent(sent):
         nonlocal lc_tbd
@@ -188,7 +191,7 @@ def load_sents(inF, morph_syn=True, misc=True, ss_mapper=None,
         # check lextags
         smweGroups = [smwe['toknums'] for smwe in sent['smwes'].values()]
         wmweGroups = [wmwe['toknums'] for wmwe in sent['wmwes'].values()]
-        tagging = sent_tags(len(sent['toks']), sent['mwe'], smweGroups, wmweGroups)
+        tagging = sent_tags(len(sent['toks']), sent['mwe'], smweGroups, wmweGroups, report)
         for tok,tag in zip(sent['toks'],tagging):
             fulllextag = tag
             if tok['smwe']:
@@ -370,48 +373,51 @@ def load_sents(inF, morph_syn=True, misc=True, ss_mapper=None,
         _postproc_sent(sent)
         yield sent
 
+    if report:
+        summarize_report(report, verbose)
+
     if lc_tbd>0:
         print('Tokens with lexcat TBD:', lc_tbd, file=sys.stderr)
         assert False,'PLACEHOLDER LEXCATS ARE DISALLOWED'
 
-def print_sent_json(sent):
+def print_sent_json(sent, file=None):
     list_fields = ("toks", "etoks")
     dict_fields = ("swes", "smwes", "wmwes")
 
     sent_copy = dict(sent)
     for fld in list_fields+dict_fields:
         del sent_copy[fld]
-    print(json.dumps(sent_copy, indent=1)[:-2], end=',\n')
+    print(json.dumps(sent_copy, indent=1)[:-2], end=',\n', file=file)
     for fld in list_fields:
-        print('   ', json.dumps(fld)+':', '[', end='')
+        print('   ', json.dumps(fld)+':', '[', end='', file=file)
         if sent[fld]:
-            print()
-            print(',\n'.join('      ' + json.dumps(v) for v in sent[fld]))
-            print('    ],')
+            print(file=file)
+            print(',\n'.join('      ' + json.dumps(v) for v in sent[fld]), file=file)
+            print('    ],', file=file)
         else:
-            print('],')
+            print('],', file=file)
     for fld in dict_fields:
-        print('   ', json.dumps(fld)+':', '{', end='')
+        print('   ', json.dumps(fld)+':', '{', end='', file=file)
         if sent[fld]:
-            print()
-            print(',\n'.join('      ' + json.dumps(str(k))+': ' + json.dumps(v) for k,v in sent[fld].items()))
-            print('    }', end='')
+            print(file=file)
+            print(',\n'.join('      ' + json.dumps(str(k))+': ' + json.dumps(v) for k,v in sent[fld].items()), file=file)
+            print('    }', end='', file=file)
         else:
-            print('}', end='')
-        print(',' if fld!="wmwes" else '')
-    print('}', end='')
+            print('}', end='', file=file)
+        print(',' if fld!="wmwes" else '', file=file)
+    print('}', end='', file=file)
 
-def print_json(sents):
-    print('[')
+def print_json(sents, file=None):
+    print('[', file=file)
     first = True
     for sent in sents:
         # specially format the output
         if first:
             first = False
         else:
-            print(',')
-        print_sent_json(sent)
-    print(']')
+            print(',', file=file)
+        print_sent_json(sent, file=file)
+    print(']', file=file)
 
 if __name__ == '__main__':
     argparser = ArgumentParser(description=desc)
@@ -421,4 +427,5 @@ if __name__ == '__main__':
     argparser.add_argument("--no-validate-pos", action="store_false", dest="validate_pos")
     argparser.add_argument("--no-validate-type", action="store_false", dest="validate_type")
     argparser.add_argument("--store-conllulex", choices=(False, 'full', 'toks'))
+    argparser.add_argument("-v", "--verbose", action="store_true")
     print_json(load_sents(**vars(argparser.parse_args())))
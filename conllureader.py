@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Lightweight reading of .conllu and .conllulex files, shared by the scripts
+in pssid/ and releaseutil/ (via their helpers modules).
+
+Input is read in large buffered blocks, decompressing it if the file name
+ends in .gz, .bz2, or .xz. Each token line is kept as a string and only
+split into fields when a field is first accessed; metadata lines of a
+sentence are only parsed into key-value pairs when they are first looked up.
+
+Usage:
+
+  from conllureader import read_sentences
+  for meta, lines in read_sentences(inF):
+      ...
+
+Run with --benchmark to compare with eager parsing of every line.
+"""
+
+import bz2
+import gzip
+import io
+import itertools
+import lzma
+import os
+import sys
+
+BUFFER_SIZE = 1 << 20   # bytes read from the input at a time
+
+COMPRESSED_OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+def open_input(filename, binary=False):
+    """Open a file for reading as UTF-8 text (or as bytes if binary is true), decompressing it
+    according to its extension (.gz, .bz2, .xz); "-" stands for standard input"""
+    if filename == '-':
+        return sys.stdin.buffer if binary else io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+    opener = COMPRESSED_OPENERS.get(os.path.splitext(filename)[1])
+    if opener is None:
+        f = open(filename, 'rb', buffering=BUFFER_SIZE)
+    else:
+        f = io.BufferedReader(opener(filename, 'rb'), BUFFER_SIZE)
+    return f if binary else io.TextIOWrapper(f, encoding='utf-8')
+
+def _lines_with_offsets(f):
+    """Decode the lines of a binary file, pairing each with its byte offset"""
+    pos = 0
+    for line in f:
+        yield pos, line.decode('utf-8')
+        pos += len(line)
+
+def read_sentences(f, offsets=False):
+    """
+    Given a file name (see open_input()) or an open file, iterate over (metadata lines, token lines)
+    pairs, one for each sentence. Lines are stripped of surrounding whitespace; a sentence ends
+    at each blank line, so consecutive blank lines produce empty sentences. The file is closed at the end.
+
+    >>> list(read_sentences(io.StringIO('# sent_id = a\\n1\\tHi\\n\\n1\\tBye\\n')))
+    [(['# sent_id = a'], ['1\\tHi']), ([], ['1\\tBye'])]
+
+    With offsets, the file is read as bytes (an open file must be binary), and (byte offset, metadata lines,
+    token lines) triples are yielded instead, giving the position in the (decompressed) input
+    at which each sentence begins:
+
+    >>> list(read_sentences(io.BytesIO('# sent_id = a \\r\\n1\\tHé\\r\\n\\r\\n1\\tBye\\n'.encode('utf-8')), offsets=True))
+    [(0, ['# sent_id = a'], ['1\\tHé']), (25, [], ['1\\tBye'])]
+    """
+    if isinstance(f, str):
+        f = open_input(f, binary=offsets)
+    lines, meta, start = [], [], 0
+    with f:
+        for pos, line in (_lines_with_offsets(f) if offsets else zip(itertools.repeat(None), f)):
+            if start is None:
+                start = pos
+            line = line.strip()
+            if not line:
+                yield (start, meta, lines) if offsets else (meta, lines)
+                lines, meta, start = [], [], None
+            elif line.startswith('#'):
+                meta.append(line)
+            else:
+                lines.append(line)
+    if lines:
+        yield (start, meta, lines) if offsets else (meta, lines)
+
+class TokenLine(object):
+    """
+    A token line, split into fields (strings) only on first access.
+    Subclasses name the fields with field().
+
+    >>> tok = TokenLine('3\\tran\\t_')
+    >>> tok._fields is None
+    True
+    >>> tok.fields
+    ['3', 'ran', '_']
+    >>> tok.values
+    ['3', 'ran', None]
+    """
+    __slots__ = ('orig', '_fields', '_values')
+
+    def __init__(self, orig):
+        self.orig = orig
+        self._fields = None
+        self._values = None
+
+    @property
+    def fields(self):
+        fields = self._fields
+        if fields is None:
+            fields = self._fields = self.orig.split('\t')
+        return fields
+
+    @property
+    def values(self):
+        """The fields, with None for fields consisting only of underscores (or empty)"""
+        values = self._values
+        if values is None:
+            values = self._values = [f if f.strip('_') else None for f in self.fields]
+        return values
+
+def field(i, underscore_as_none=False):
+    """
+    Property for the i-th field of a TokenLine. With underscore_as_none,
+    a field consisting only of underscores (or empty) is None.
+
+    >>> class Tok(TokenLine):
+    ...     __slots__ = ()
+    ...     word = field(1)
+    ...     lemma = field(2, underscore_as_none=True)
+    >>> Tok('1\\t_\\t_').word, Tok('1\\t_\\t_').lemma
+    ('_', None)
+    """
+    # (the cached list is checked here to avoid a second property lookup on each access)
+    if underscore_as_none:
+        def get(self):
+            values = self._values
+            return (self.values if values is None else values)[i]
+    else:
+        def get(self):
+            fields = self._fields
+            return (self.fields if fields is None else fields)[i]
+    return property(get)
+
+def parse_meta(meta, warn=True):
+    """
+    Parse metadata lines of the form "# key = value" into a dict.
+    Other comment lines are ignored (with a warning if warn is true).
+
+    >>> parse_meta(['# sent_id = a-1', '# text = x = y', '# hello'], warn=False)
+    {'sent_id': 'a-1', 'text': 'x = y'}
+    """
+    meta_dict = {}
+    for meta_info in meta:
+        if ' = ' not in meta_info:
+            if warn:
+                print('Ignoring comment line:', meta_info, file=sys.stderr)
+        else:
+            k, v = meta_info.strip("# ").split(" = ", 1)
+            meta_dict[k] = v
+    return meta_dict
+
+def benchmark(filenames, repeat=3):
+    """Time reading the files with TokenLine, accessing no field or one field of every token,
+    against splitting every line eagerly"""
+    import timeit
+
+    class Tok(TokenLine):
+        __slots__ = ()
+        lemma = field(2, underscore_as_none=True)
+
+    def eager():
+        for fn in filenames:
+            for meta, lines in read_sentences(fn):
+                toks = [[f if f.strip('_') else None for f in line.split('\t')] for line in lines]
+
+    def lazy_untouched():
+        for fn in filenames:
+            for meta, lines in read_sentences(fn):
+                toks = [Tok(line) for line in lines]
+
+    def lazy_lemmas():
+        for fn in filenames:
+            for meta, lines in read_sentences(fn):
+                lemmas = [Tok(line).lemma for line in lines]
+
+    for name, f in [('eager split of every field', eager), ('lazy, no field accessed', lazy_untouched),
+                    ('lazy, one field accessed', lazy_lemmas)]:
+        t = min(timeit.repeat(f, number=1, repeat=repeat))
+        print(f'{name:30} {t:.3f}s')
+
+if __name__=='__main__':
+    if sys.argv[1:2]==['--benchmark']:
+        benchmark(sys.argv[2:] or [os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dev', 'streusle.ud_dev.conllulex')])
+    else:
+        import doctest
+        doctest.testmod()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Statistics of a .conllulex corpus: the files STATS.md, MWES.txt, LEXCAT.txt,
+and SUPERSENSES.txt of a release, computed in a single pass over the corpus.
+
+The output is byte-for-byte what releaseutil/stats.sh (which this replaces)
+produced with its grep/cut/sort/uniq pipelines in the C locale, so the counts
+follow the same conventions: e.g., supersense counts include UD multiword
+tokens, while the token and lemma counts exclude them and ellipsis nodes.
+
+Usage (writes the files to the directory of each corpus file, processing
+the files concurrently):
+
+  corpusstats.py streusle.conllulex {train,dev,test}/streusle.ud_*.conllulex
+
+or, for sentences already in memory:
+
+  from conllureader import read_sentences
+  from corpusstats import corpus_stats
+  stats = corpus_stats(read_sentences(inF))
+  print(stats.render()['MWES.txt'])
+"""
+
+import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from conllureader import open_input
+
+STATS_FILES = ('STATS.md', 'MWES.txt', 'LEXCAT.txt', 'SUPERSENSES.txt')
+
+MULTIWORD_OR_ELLIPSIS = re.compile(r'[0-9]+[-\\.][0-9]')    # ID of a UD multiword token or ellipsis node (as in stats.sh)
+GAP = re.compile(r'[bio][~_]? I[~_]')
+STRONG_GAP = re.compile(r'[bio][~_]? I_')
+WEAK_GAP = re.compile(r'[bio][~_]? I~')
+MULTIGAP = re.compile(r'[bio][~_]? (I_\S* )+[bio]')
+CONGRUENT = re.compile(r'(p\.[A-Za-z-]+)\t\1')
+CONSTRUAL = re.compile(r'(p\.[A-Za-z-]+)\tp\.[A-Za-z-]+')
+TEMPORAL = ('p.Time', 'p.Frequency', 'p.Duration', 'p.Interval', 'p.Temporal')
+LOCATIVE = ('p.Locus', 'p.Source', 'p.Path', 'p.Goal', 'p.Direction', 'p.Extent')
+
+def _cut(fields, *cols):
+    """
+    The given columns (1-based) of a line split at tabs, as selected by cut -f:
+    a line without tabs is kept whole.
+
+    >>> _cut(['a', 'b', 'c'], 2, 3), _cut(['a', 'b'], 3), _cut(['# text = a b'], 3)
+    ('b\\tc', '', '# text = a b')
+    """
+    if len(fields) == 1:
+        return fields[0]
+    return '\t'.join(fields[c-1] for c in cols if c <= len(fields))
+
+def _uniq_c(counter):
+    """Lines of sort | uniq -c output for the counted strings"""
+    return ''.join('{:7d} {}\n'.format(n, s) for s, n in sorted(counter.items()))
+
+class CorpusStats(object):
+    """
+    Counts for the statistics files, accumulated one line of the corpus at a time.
+
+    >>> stats = CorpusStats()
+    >>> stats.add_sentence(['# newdoc id = d', '# sent_id = d-1'],
+    ...     ['1\\tGo\\tgo' + '\\t_'*7 + '\\t1:1\\tV\\tgo_on\\tv.motion' + '\\t_'*4 + '\\tB-V-v.motion',
+    ...      '2\\ton\\ton' + '\\t_'*7 + '\\t1:2\\t_\\t_\\t_' + '\\t_'*4 + '\\tI_'])
+    >>> print(stats.render()['STATS.md'].splitlines()[3])
+    * Documents:           1
+    >>> print(stats.render()['LEXCAT.txt'], end='')
+          1 V
+          1 _
+    """
+    def __init__(self):
+        self.docs = self.sents = self.words = 0
+        self.lemmas = set()
+        self.lextags = set()
+        self.smwes = self.smwes_nogoeswith = self.wmwes = self.wmwes_nogoeswith = 0
+        self.mwetags = []   # MWE position part of each word's lextag, for finding gaps
+        self.smwe_positions = Counter()
+        self.wmwe_positions = Counter()
+        self.smwe_lexcats = Counter()
+        self.lexcats = Counter()
+        self.supersenses = Counter()
+        self.ss_totals = Counter()  # 'n', 'v', 'p' -> count
+        self.ss_lexcats = {'n': Counter(), 'v': Counter(), 'p': Counter()}
+        self.construals = Counter()
+        self.spatiotemporality = Counter()
+
+    def add_line(self, line):
+        """Count a line of the corpus (without its newline)"""
+        if '# newdoc id' in line:
+            self.docs += 1
+        if '# sent_id' in line:
+            self.sents += 1
+        if not line:
+            return
+        fields = line.split('\t')
+
+        if not line.startswith('#'):
+            smwe = _cut(fields, 11)
+            if smwe.endswith(':1'):
+                self.smwes += 1
+            if ':' in smwe:
+                self.smwe_positions[smwe.split(':')[1]] += 1
+            if ' ' in _cut(fields, 13):
+                self.smwes_nogoeswith += 1
+            wmwe = _cut(fields, 16)
+            if wmwe.endswith(':1'):
+                self.wmwes += 1
+            if ':' in wmwe:
+                self.wmwe_positions[wmwe.split(':')[1]] += 1
+            if ' ' in _cut(fields, 18):
+                self.wmwes_nogoeswith += 1
+            smwe_lexcat = _cut(fields, 11, 12)
+            if ':1\t' in smwe_lexcat:
+                self.smwe_lexcats[smwe_lexcat.split('\t')[1]] += 1
+            self.lexcats[_cut(fields, 12)] += 1
+            self.supersenses[_cut(fields, 14, 15)] += 1
+
+            if not MULTIWORD_OR_ELLIPSIS.match(line):
+                self.words += 1
+                self.lemmas.add(_cut(fields, 3))
+                lextag = _cut(fields, 19)
+                self.lextags.add(lextag)
+                self.mwetags.append(lextag[:1] + lextag[1:].split('-', 1)[0])
+
+        ss = _cut(fields, 14, 15)[:2]
+        if len(ss)==2 and ss[0] in 'nvp':
+            self.ss_totals[ss[0]] += 1
+        lexcat_ss = _cut(fields, 12, 14, 15)
+        for kind in 'nvp':
+            if '\t'+kind+'.' in lexcat_ss:
+                self.ss_lexcats[kind][lexcat_ss.split('\t', 1)[0]] += 1
+        if '\tp.' in lexcat_ss:
+            ln = lexcat_ss.strip()
+            congruent = CONGRUENT.sub('p.X ~> p.X', ln)
+            self.construals[congruent if congruent!=ln else CONSTRUAL.sub('p.X ~> p.Y', ln)] += 1
+            lc, r, f = ln.split('\t')
+            r = 'p.TMP' if r in TEMPORAL else 'p.LOC' if r in LOCATIVE else 'p.OTH'
+            self.spatiotemporality[lc + ' \t' + r + ' ~> *'] += 1
+
+    def add_sentence(self, meta, lines):
+        """Count a sentence given as metadata lines and token lines (see conllureader.read_sentences())"""
+        for line in meta:
+            self.add_line(line)
+        for line in lines:
+            self.add_line(line)
+
+    def render(self):
+        """The contents of the statistics files, by file name"""
+        stats = ('STREUSLE Stats\n'
+                 '==============\n'
+                 '\n'
+                 '* Documents:           {}\n'
+                 '* Sentences:           {}\n'
+                 '* Tokens:              {} (excludes UD ellipsis nodes and UD multiword tokens)\n'
+                 '* Unique lemmas:       {}\n'
+                 '* Unique full lextags: {}\n'
+                 '* [LexCat](LEXCAT.txt)\n'
+                 '* [MWEs](MWES.txt)\n'
+                 '* [Supersenses](SUPERSENSES.txt)\n').format(self.docs, self.sents, self.words, len(self.lemmas), len(self.lextags))
+
+        mwetags = ''.join(tag + ' ' for tag in self.mwetags)
+        mwes = ('Strong MWEs: {:4d}\n'
+                '...not counting goeswith MWEs: {:4d}\n'
+                'Weak MWEs:   {:4d}\n'
+                '...not counting goeswith MWEs: {:4d}\n'
+                '\n'
+                'MWE Gaps\n'
+                '========\n'
+                'Strong gaps:   {:4d}\n'
+                'Weak gaps:     {:4d}\n'
+                'Total gaps:    {:4d}\n'
+                'Multi-gap MWEs:{:4d}\n'
+                '\n'
+                'Strong MWE token positions\n'
+                '==========================\n'
+                'There are ... MWEs >= ... tokens long:\n'
+                '{}'
+                '\n'
+                'Weak MWE token positions\n'
+                '========================\n'
+                '{}'
+                '\n'
+                'Strong MWEs by LexCat\n'
+                '=====================\n'
+                '{}').format(self.smwes, self.smwes_nogoeswith, self.wmwes, self.wmwes_nogoeswith,
+                             len(STRONG_GAP.findall(mwetags)), len(WEAK_GAP.findall(mwetags)), len(GAP.findall(mwetags)),
+                             len(MULTIGAP.findall(mwetags)),
+                             _uniq_c(self.smwe_positions), _uniq_c(self.wmwe_positions), _uniq_c(self.smwe_lexcats))
+
+        supersenses = ('{}'
+                       '========================\n'
+                       '{} n.*\n'
+                       '{} v.*\n'
+                       '{} p.*\n').format(_uniq_c(self.supersenses), self.ss_totals['n'], self.ss_totals['v'], self.ss_totals['p'])
+        for kind in 'nvp':
+            supersenses += ('\n'
+                            '{}.* by LexCat\n'
+                            '========================\n'
+                            '{}').format(kind, _uniq_c(self.ss_lexcats[kind]))
+        supersenses += ('\n'
+                        'p.* by LexCat + construal type\n'
+                        '========================\n'
+                        '{}'
+                        '\n'
+                        'p.* by LexCat + spatiotemporality\n'
+                        '(TMP = Time|Frequency|Duration|Interval|Temporal, LOC=Locus|Source|Path|Goal|Direction|Extent [not necessarily concrete])\n'
+                        '========================\n'
+                        '{}'
+                        '\n').format(_uniq_c(self.construals), _uniq_c(self.spatiotemporality))
+
+        return {'STATS.md': stats, 'MWES.txt': mwes, 'LEXCAT.txt': _uniq_c(self.lexcats), 'SUPERSENSES.txt': supersenses}
+
+    def write(self, directory='.'):
+        """Write the statistics files to the directory"""
+        for filename, text in self.render().items():
+            with open(os.path.join(directory, filename), 'w', encoding='utf-8') as outF:
+                outF.write(text)
+
+def corpus_stats(sentences):
+    """Statistics of sentences given as (metadata lines, token lines) pairs, e.g. from conllureader.read_sentences()"""
+    stats = CorpusStats()
+    for meta, lines in sentences:
+        stats.add_sentence(meta, lines)
+    return stats
+
+def file_stats(filename):
+    """Statistics of a .conllulex file (which may be compressed; see conllureader.open_input())"""
+    stats = CorpusStats()
+    with open_input(filename) as inF:
+        for line in inF:
+            stats.add_line(line.rstrip('\n'))
+    return stats
+
+def write_file_stats(filename, directory=None):
+    """Write the statistics files for a .conllulex file, by default to the directory containing it"""
+    file_stats(filename).write(os.path.dirname(filename) if directory is None else directory)
+    return filename
+
+def write_all_stats(filenames, jobs=None):
+    """Write the statistics files for each .conllulex file to its directory, processing the files concurrently"""
+    with ProcessPoolExecutor(jobs or len(filenames)) as executor:
+        for filename in executor.map(write_file_stats, filenames):
+            print('Wrote statistics for', filename, file=sys.stderr)
+
+if __name__=='__main__':
+    if len(sys.argv)>1:
+        write_all_stats(sys.argv[1:])
+    else:
+        import doctest
+        doctest.testmod()
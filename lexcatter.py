@@ -1,5 +1,20 @@
 from supersenses import NSS, VSS, PSS
 
+# lexcats determined by shorthand annotations in the supersense column
+SS_SHORTHAND_LEXCATS = {'`a': 'AUX', '`c': 'CCONJ', '`d': 'DISC', '`i': 'INF', '`j': 'ADJ',
+                        '`n': 'N', '`o': 'PRON', '`r': 'ADV', '`v': 'V', '??': '??'}
+
+# lexcats of expressions with an adposition supersense or `$ determined by the XPOS
+PSS_XPOS_LEXCATS = {'PRP$': 'PRON.POSS', 'WP$': 'PRON.POSS', 'POS': 'POSS', 'TO': 'INF.P'}
+
+# tokens that need examination if not covered by the above
+EXAMINE_UPOS = frozenset({'NOUN', 'VERB', 'ADP'})
+EXAMINE_XPOS = frozenset({'POS', 'PRP$', 'WP$', 'TO'})
+
+DET_MWE_LEXLEMMAS = frozenset({'a lot', 'a couple', 'a few', 'a little', 'a bit', 'a number', 'a bunch'})
+PRON_MWE_LEXLEMMAS = frozenset({'no one', 'every one', 'every thing', 'each other', 'some place'})
+AUX_MWE_LEXLEMMAS = frozenset({'might as well'})
+
 def compute_lexcat(tokNum, smwe, smweGroupToks, ss, lexlemma, poses, rels):
     """
     The lexical category, or LexCat, is the syntactic category of a strong
@@ -42,8 +57,7 @@ def compute_lexcat(tokNum, smwe, smweGroupToks, ss, lexlemma, poses, rels):
         # non-initial token in MWE
         return '_'
 
-    lc = {'`a': 'AUX', '`c': 'CCONJ', '`d': 'DISC', '`i': 'INF', '`j': 'ADJ',
-          '`n': 'N', '`o': 'PRON', '`r': 'ADV', '`v': 'V', '??': '??'}.get(ss)
+    lc = SS_SHORTHAND_LEXCATS.get(ss)
 
     if lc is not None: return lc
     if ss.isalpha() and ss.isupper(): return 'N'
@@ -51,7 +65,7 @@ def compute_lexcat(tokNum, smwe, smweGroupToks, ss, lexlemma, poses, rels):
 
     upos, xpos = poses[tokNum-1]
     if ss=='`$' or (ss[0].isupper() and ss[1].islower()):
-        lc = {'PRP$': 'PRON.POSS', 'WP$': 'PRON.POSS', 'POS': 'POSS', 'TO': 'INF.P'}.get(xpos)
+        lc = PSS_XPOS_LEXCATS.get(xpos)
         if lc is not None: return lc
         assert ss!='`$'
         if smwe!='_':
@@ -59,19 +73,19 @@ def compute_lexcat(tokNum, smwe, smweGroupToks, ss, lexlemma, poses, rels):
                 return 'P'
             return 'PP'
         return 'P'
-    if upos in ('NOUN', 'VERB', 'ADP') or xpos in ('POS', 'PRP$', 'WP$', 'TO'):
+    if upos in EXAMINE_UPOS or xpos in EXAMINE_XPOS:
         return '!!@'
     if upos=='PART':
         return 'ADV'
 
     if smwe!='_':
         if upos=='DET':
-            if lexlemma in ('a lot', 'a couple', 'a few', 'a little', 'a bit', 'a number', 'a bunch'):
+            if lexlemma in DET_MWE_LEXLEMMAS:
                 return 'DET'
-            elif lexlemma in ('no one', 'every one', 'every thing', 'each other', 'some place'):
+            elif lexlemma in PRON_MWE_LEXLEMMAS:
                 return 'PRON'
         if upos=='AUX':
-            if lexlemma in ('might as well',):
+            if lexlemma in AUX_MWE_LEXLEMMAS:
                 return 'AUX'
 
         head,rel = rels[tokNum-1]
@@ -98,14 +112,72 @@ def compute_lexcat(tokNum, smwe, smweGroupToks, ss, lexlemma, poses, rels):
         return '!@'
     return upos
 
+def compute_lexcats(tokNum, ss, upos, xpos, smwe, head, lexlemma):
+    """
+    Compute the lexcats of all tokens of a corpus in one pass (see compute_lexcat()),
+    given its columns as parallel sequences, e.g. from an annotation spreadsheet:
+    token numbers (restarting at 1 with each sentence; no multiword token or ellipsis lines),
+    supersense annotations (_ if none), UPOS, XPOS, strong MWE positions (GROUP:POSITION, or _),
+    heads (token numbers), and lexlemmas.
+
+    >>> cols = ([1, 2, 3, 4, 5, 1, 2, 3],
+    ...         ['Locus', '_', 'PERSON', '_', '_', 'eat', '`$', 'Topic'],
+    ...         ['ADP', 'DET', 'NOUN', 'ADV', 'ADV', 'VERB', 'PRON', 'ADP'],
+    ...         ['IN', 'DT', 'NN', 'RB', 'RB', 'VB', 'PRP$', 'IN'],
+    ...         ['_', '_', '_', '1:1', '1:2', '1:1', '_', '1:2'],
+    ...         [3, 3, 0, 5, 3, 0, 1, 1],
+    ...         ['at', 'the', 'store', 'right now', '_', 'eat about', 'my', '_'])
+    >>> lexcats = compute_lexcats(*cols)
+    >>> lexcats
+    ['P', 'DET', 'N', 'ADV', '_', 'V', 'PRON.POSS', '_']
+
+    This is the same as computing the lexcat of each token with compute_lexcat():
+
+    >>> sents = [(0, 5), (5, 8)]
+    >>> lexcats==[compute_lexcat(cols[0][i], cols[4][i],
+    ...                          [t-a+1 for t in range(a, b) if cols[4][t].split(':')[0]==cols[4][i].split(':')[0]!='_'],
+    ...                          cols[1][i], cols[6][i], list(zip(cols[2][a:b], cols[3][a:b])),
+    ...                          [(h, None) for h in cols[5][a:b]])
+    ...           for a, b in sents for i in range(a, b)]
+    True
+    """
+    lexcats = []
+    poses, rels, smweGroupToks = [], [], {}   # of the current sentence
+    start = 0   # index of the current sentence's first token
+    for i in range(len(tokNum)+1):
+        if i==len(tokNum) or (tokNum[i]==1 and i>start):
+            # end of sentence: all its columns have been gathered
+            for j in range(start, i):
+                m = smwe[j]
+                lexcats.append(compute_lexcat(tokNum[j], m, smweGroupToks.get(m.split(':')[0]), ss[j], lexlemma[j],
+                                              poses, rels))
+            poses, rels, smweGroupToks = [], [], {}
+            start = i
+            if i==len(tokNum):
+                break
+        poses.append((upos[i], xpos[i]))
+        rels.append((head[i], None))    # dependency relations are not consulted
+        if smwe[i]!='_':
+            smweGroupToks.setdefault(smwe[i].split(':')[0], []).append(tokNum[i])
+    return lexcats
+
+VMWE_LEXCATS = frozenset({'V.VID', 'V.VPC.full', 'V.VPC.semi', 'V.LVC.full', 'V.LVC.cause', 'V.IAV'}) # PARSEME 1.1 verbal MWE subtypes
+
+SNACS_SS = frozenset(PSS - {'p.Content'})   # specific to English
+
+# lexcat -> valid supersenses
+LEXCAT_SUPERSENSES = {'N': NSS, 'V': VSS,
+                      'P': SNACS_SS, 'PP': SNACS_SS, 'INF.P': SNACS_SS,
+                      'POSS': SNACS_SS | {'`$'}, 'PRON.POSS': SNACS_SS | {'`$'}}
+LEXCAT_SUPERSENSES.update(dict.fromkeys(VMWE_LEXCATS, VSS))
+
 def supersenses_for_lexcat(lc): # specific to English
-    if lc=='N': return NSS
-    if lc=='V' or lc.startswith('V.'):
-        if lc!='V':
-            assert lc in {'V.VID', 'V.VPC.full', 'V.VPC.semi', 'V.LVC.full', 'V.LVC.cause', 'V.IAV'},lc # PARSEME 1.1 verbal MWE subtypes
-        return VSS
-    if lc in ('P', 'PP', 'INF.P'): return (PSS - {'p.Content'})
-    if lc in ('POSS', 'PRON.POSS'): return (PSS - {'p.Content'}) | {'`$'}
+    """Valid supersenses for a lexcat, or None if it does not take supersenses.
+    The returned sets are shared and should not be modified."""
+    result = LEXCAT_SUPERSENSES.get(lc)
+    if result is None and lc.startswith('V.'):
+        assert lc in VMWE_LEXCATS,lc
+    return result
 
 ALL_LEXCATS = {'N', 'PRON', 'V', 'P', 'PP', 'INF', 'INF.P', 'POSS', 'PRON.POSS', 'DISC', 'AUX',
                'ADJ', 'ADV', 'DET', 'CCONJ', 'SCONJ', 'INTJ', 'NUM', 'SYM', 'PUNCT', 'X'}
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Integer-coded vocabulary of lextags and their components.
+
+A lextag is the full tag in the last column of .conllulex, e.g. B-P-p.Locus|p.Goal.
+It consists of an MWE position tag (O, B, I_, I~, o, b, i_, i~), and, for the
+first token of a strong lexical expression, a lexcat, a supersense label
+(supersense, or scene role and function separated by |) if any, and
+the lexcat of a weak MWE starting at the token (after +) if any.
+
+Each lextag and each component is interned as an integer ID. IDs of MWE tags,
+lexcats, and single supersenses are fixed; IDs of other components and of
+full lextags are assigned in order of first occurrence, so they are specific
+to a Vocab (a Vocab can be recreated from its `lextags` list).
+
+Usage (integer-coded lextag arrays for each sentence of a corpus):
+
+  from lextags import load_tag_arrays
+  for sentId, tagIds in load_tag_arrays(inF):
+      ...
+"""
+
+from array import array
+
+from conllulex2json import load_sents
+from lexcatter import ALL_LEXCATS
+from supersenses import ALL_SS, get_ss_mapper
+
+MWE_TAGS = ('O', 'B', 'I_', 'I~', 'o', 'b', 'i_', 'i~')
+
+def split_lextag(lextag):
+    """
+    Split a lextag into (MWE tag, lexcat, supersense label, weak MWE lexcat),
+    with '' for missing components.
+
+    >>> split_lextag('B-P-p.Locus|p.Goal')
+    ('B', 'P', 'p.Locus|p.Goal', '')
+    >>> split_lextag('I_')
+    ('I_', '', '', '')
+    >>> split_lextag('B-V-v.social+V.LVC.full')
+    ('B', 'V', 'v.social', 'V.LVC.full')
+    """
+    tags, _, wcat = lextag.partition('+')
+    mwetag, lexcat, sslabel = (tags + '--').split('-', 2)
+    return mwetag, lexcat, sslabel.rstrip('-'), wcat
+
+def join_lextag(mwetag, lexcat, sslabel, wcat):
+    return mwetag + ('-'+lexcat if lexcat else '') + ('-'+sslabel if sslabel else '') + ('+'+wcat if wcat else '')
+
+class Interner(object):
+    """Bidirectional mapping between strings and consecutive integer IDs"""
+    def __init__(self, items=()):
+        self.ids = {}
+        self.items = []
+        for x in items:
+            self.encode(x)
+
+    def encode(self, x):
+        i = self.ids.get(x)
+        if i is None:
+            i = self.ids[x] = len(self.items)
+            self.items.append(x)
+        return i
+
+    def decode(self, i):
+        return self.items[i]
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, x):
+        return x in self.ids
+
+class Vocab(object):
+    """
+    Vocabulary of lextags.
+
+    >>> v = Vocab()
+    >>> i = v.encode('B-P-p.Locus|p.Goal')
+    >>> v.decode(i)
+    'B-P-p.Locus|p.Goal'
+    >>> v.encode('B-P-p.Locus|p.Goal')==i
+    True
+    >>> [v.mwetags.decode(c) if k==0 else v.lexcats.decode(c) if k==1 else v.sslabels.decode(c) if k==2 else v.wcats.decode(c)
+    ...  for k,c in enumerate(v.components(i))]
+    ['B', 'P', 'p.Locus|p.Goal', '']
+    >>> v.decode(v.coarsen(i, 1))
+    'B-P-p.Circumstance'
+    >>> j = v.project(i, lexcat=False)
+    >>> v.decode(j), v.sslabels.decode(v.components(j)[2])
+    ('B-p.Locus|p.Goal', 'p.Locus|p.Goal')
+    >>> v.decode(v.coarsen(j, 1))
+    'B-p.Circumstance'
+    """
+    def __init__(self, lextags=()):
+        self.mwetags = Interner(MWE_TAGS)
+        self.lexcats = Interner([''] + sorted(ALL_LEXCATS))
+        self.sslabels = Interner([''] + sorted(ALL_SS))
+        self.wcats = Interner([''])
+        self.lextags = Interner()
+        self._components = []   # lextag ID -> (MWE tag ID, lexcat ID, supersense label ID, weak lexcat ID)
+        self._coarsened = {}    # depth -> list: lextag ID -> coarsened lextag ID (extended as needed)
+        for lt in lextags:
+            self.encode(lt)
+
+    def encode(self, lextag):
+        i = self.lextags.ids.get(lextag)
+        if i is None:
+            i = self.lextags.encode(lextag)
+            mwetag, lexcat, sslabel, wcat = split_lextag(lextag)
+            assert mwetag in self.mwetags,lextag
+            self._components.append((self.mwetags.encode(mwetag), self.lexcats.encode(lexcat),
+                                     self.sslabels.encode(sslabel), self.wcats.encode(wcat)))
+        return i
+
+    def _encode_components(self, mwetagId, lexcatId, sslabelId, wcatId):
+        """ID of the lextag with the given component IDs (which need not be recoverable
+        from the lextag string by split_lextag(), e.g. if the lexcat is missing)"""
+        lextag = join_lextag(self.mwetags.decode(mwetagId), self.lexcats.decode(lexcatId),
+                             self.sslabels.decode(sslabelId), self.wcats.decode(wcatId))
+        i = self.lextags.ids.get(lextag)
+        if i is None:
+            i = self.lextags.encode(lextag)
+            self._components.append((mwetagId, lexcatId, sslabelId, wcatId))
+        return i
+
+    def decode(self, i):
+        return self.lextags.decode(i)
+
+    def components(self, i):
+        """IDs of the MWE tag, lexcat, supersense label, and weak MWE lexcat of the lextag"""
+        return self._components[i]
+
+    def coarsen(self, i, depth):
+        """ID of the lextag with SNACS labels coarsened to the given depth of the hierarchy"""
+        table = self._coarsened.setdefault(depth, [])
+        if i>=len(table):
+            ss_mapper = get_ss_mapper(depth)
+            for j in range(len(table), i+1):
+                mwetagId, lexcatId, sslabelId, wcatId = self._components[j]
+                sslabel = self.sslabels.decode(sslabelId)
+                if sslabel:
+                    sss = [ss_mapper(ss) for ss in sslabel.split('|')]
+                    if len(sss)==2 and sss[0]==sss[1]:  # e.g. p.Locus|p.Locus due to abstraction of p.Goal|p.Locus
+                        del sss[1]
+                    sslabelId = self.sslabels.encode('|'.join(sss))
+                table.append(self._encode_components(mwetagId, lexcatId, sslabelId, wcatId))
+        return table[i]
+
+    def project(self, i, lexcat=True, supersenses=True, wcat=True):
+        """ID of the lextag with the specified components removed"""
+        mwetagId, lexcatId, sslabelId, wcatId = self._components[i]
+        return self._encode_components(mwetagId, lexcatId if lexcat else 0,
+                                       sslabelId if supersenses else 0, wcatId if wcat else 0)
+
+    def __len__(self):
+        return len(self.lextags)
+
+VOCAB = Vocab() # shared default vocabulary
+
+def sent_tag_ids(sent, vocab=VOCAB):
+    """Integer-coded lextags of the tokens of a sentence in JSON format"""
+    return array('i', [vocab.encode(tok['lextag']) for tok in sent['toks']])
+
+def load_tag_arrays(inF, vocab=VOCAB, **kwargs):
+    """
+    Given a .conllulex or .json file, iterate over (sentence ID, integer-coded lextags)
+    pairs. Keyword arguments are passed to load_sents() (e.g., ss_mapper).
+    """
+    for sent in load_sents(inF, **kwargs):
+        yield sent['sent_id'], sent_tag_ids(sent, vocab)
+
+if __name__=='__main__':
+    import doctest
+    doctest.testmod()
@@ -1,9 +1,112 @@
 #!/usr/bin/env python3
 import sys, fileinput, json, re
-from itertools import chain
+from itertools import chain, islice
+from collections import OrderedDict
+from operator import itemgetter
 
 from supersenses import makesslabel
 
+def _render(buf, ww, sgroups, wgroups, labels):
+    """Implementation of render(), using buf (a list, extended as needed) as scratch space"""
+    n = len(ww)
+    if len(buf)<4*n:
+        buf.extend([None]*(4*n-len(buf)))
+    # before and after are None by default; remaining None's will be converted
+    # to spaces and empty strings, respectively
+    buf[0:4*n:4] = [None]*n
+    buf[1:4*n:4] = ww
+    buf[2:4*n:4] = ['']*n
+    buf[3:4*n:4] = [None]*n
+    BEFORE, LABEL, AFTER = -4, -2, -1   # slot for token i (1-based index) is 4*i+offset
+
+    singletonlabels = dict(labels)  # will be winnowed down to the labels not covered by a strong MWE
+    for group in sgroups:
+        g = sorted(group)
+        for i,j in zip(g[:-1],g[1:]):
+            if j==i+1:
+                buf[4*i+AFTER] = ''
+                buf[4*j+BEFORE] = '_'
+            else:
+                buf[4*i+AFTER] = '_'
+                buf[4*(i+1)+BEFORE] = ' '
+                buf[4*j+BEFORE] = '_'
+                buf[4*(j-1)+AFTER] = ' '
+        if g[0] in labels:
+            buf[4*g[-1]+LABEL] = '|'+labels[g[0]]
+            del singletonlabels[g[0]]
+    for i,lbl in singletonlabels.items():
+        buf[4*i+LABEL] = '|'+lbl
+    for group in wgroups:
+        g = sorted(group)
+        for i,j in zip(g[:-1],g[1:]):
+            if j==i+1:
+                if buf[4*i+AFTER] is None and buf[4*j+BEFORE] is None:
+                    buf[4*i+AFTER] = ''
+                    buf[4*j+BEFORE] = '~'
+            else:
+                if buf[4*i+AFTER] is None and buf[4*(i+1)+BEFORE] is None:
+                    buf[4*i+AFTER] = '~'
+                    buf[4*(i+1)+BEFORE] = ' '
+                if buf[4*(j-1)+AFTER] is None and buf[4*j+BEFORE] is None:
+                    buf[4*j+BEFORE] = '~'
+                    buf[4*(j-1)+AFTER] = ' '
+
+    for k in range(0, 4*n, 4):
+        if buf[k] is None: buf[k] = ' '
+        if buf[k+3] is None: buf[k+3] = ''
+    return ''.join(islice(buf, 4*n)).strip()
+
+class Renderer(object):
+    """
+    Renders lexical annotations of sentences as strings (see render()),
+    reusing scratch buffers across sentences. A Renderer is stateful,
+    so it should not be shared between threads.
+
+    If `cache_size` is given, the renderings of up to that many distinct
+    analyses are cached by render_sent(), evicting the least recently used.
+    This pays off when the same analyses are rendered repeatedly, e.g.
+    gold and system analyses of a sentence that mostly agree.
+    """
+    def __init__(self, cache_size=None):
+        # flat buffer with 4 slots per token: markup before, word, label, markup after
+        self._buf = []
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.hits = self.misses = 0
+
+    def render(self, ww, sgroups, wgroups, labels={}):
+        """Like render(), reusing this Renderer's buffer"""
+        return _render(self._buf, ww, sgroups, wgroups, labels)
+
+    def render_sent(self, sent, lexcats=True, supersenses=True, mwes=True, label_filter=None):
+        """
+        Render a sentence from its JSON representation. If `mwes` is false,
+        MWE groupings are omitted. `label_filter` is an optional function
+        that takes and returns a label map (see makelabelmap()).
+        """
+        if self.cache_size:
+            key = (analysis_key(sent, mwes), lexcats, supersenses, label_filter)
+            rendered = self._cache.get(key)
+            if rendered is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return rendered
+            self.misses += 1
+
+        toks = [tok['word'] for tok in sent['toks']]
+        smweGroups = [smwe['toknums'] for smwe in sent['smwes'].values()] if mwes else []
+        wmweGroups = [wmwe['toknums'] for wmwe in sent['wmwes'].values()] if mwes else []
+        labels = makelabelmap(sent, lexcats, supersenses) if lexcats or supersenses else {}
+        if label_filter:
+            labels = label_filter(labels)
+        rendered = self.render(toks, smweGroups, wmweGroups, labels)
+
+        if self.cache_size:
+            self._cache[key] = rendered
+            if len(self._cache)>self.cache_size:
+                self._cache.popitem(last=False)
+        return rendered
+
 def render(ww, sgroups, wgroups, labels={}):
     '''
     Converts the given lexical annotation to a UTF-8 string
@@ -40,61 +143,46 @@ def render(ww, sgroups, wgroups, labels={}):
     >>> render(ww, [[2,4],[5,6]], [[2,4,5,6]], {2: 'BD', 3: 'C'})
     'a b_ c|C _d|BD~e_f'
     '''
-    singletonlabels = dict(labels)  # will be winnowed down to the labels not covered by a strong MWE
-    before = [None]*len(ww)   # None by default; remaining None's will be converted to empty strings
-    labelafter = ['']*len(ww)
-    after = [None]*len(ww)   # None by default; remaining None's will be converted to spaces
-    for group in sgroups:
-        g = sorted(group)
-        for i,j in zip(g[:-1],g[1:]):
-            if j==i+1:
-                after[i-1] = ''
-                before[j-1] = '_'
-            else:
-                after[i-1] = '_'
-                before[i] = ' '
-                before[j-1] = '_'
-                after[j-2] = ' '
-        if g[0] in labels:
-            labelafter[g[-1]-1] = '|'+labels[g[0]]
-            del singletonlabels[g[0]]
-    for i,lbl in singletonlabels.items():
-        assert i-1 not in labelafter
-        labelafter[i-1] = '|'+lbl
-    for group in wgroups:
-        g = sorted(group)
-        for i,j in zip(g[:-1],g[1:]):
-            if j==i+1:
-                if after[i-1] is None and before[j-1] is None:
-                    after[i-1] = ''
-                    before[j-1] = '~'
-            else:
-                if after[i-1] is None and before[i] is None:
-                    after[i-1] = '~'
-                    before[i] = ' '
-                if after[j-2] is None and before[j-1] is None:
-                    before[j-1] = '~'
-                    after[j-2] = ' '
+    return _render([], ww, sgroups, wgroups, labels)
+
+def analysis_key(sent, mwes=True):
+    """Hashable representation of the words and lexical semantic analysis
+    of a sentence in JSON format, i.e., everything that can be rendered.
+    If `mwes` is false, the MWE groupings are excluded."""
+    words = tuple(map(_getword, sent['toks']))
+    lexes = chain(sent['swes'].values(), sent['smwes'].values())
+    if mwes:
+        return (words,
+                tuple([(tuple(lexe['toknums']), lexe['lexcat'], lexe['ss'], lexe['ss2']) for lexe in lexes]),
+                tuple([tuple(wmwe['toknums']) for wmwe in sent['wmwes'].values()]))
+    return (words, tuple([(lexe['toknums'][0], lexe['lexcat'], lexe['ss'], lexe['ss2']) for lexe in lexes]))
 
-    after = ['' if x is None else x for x in after]
-    before = [' ' if x is None else x for x in before]
-    return ''.join(sum(zip(before,ww,labelafter,after), ())).strip()
+_getword = itemgetter('word')
+
+_labels = {}    # memoized labels: (lexcat, ss, ss2, include_lexcat, include_supersenses) -> label
 
 def makelabel(lexe, include_lexcat=True, include_supersenses=True):
     """Serialize a strong lexical expression's lexcat and/or supersenses
     in a string for the inline rendering of the sentence"""
+    key = (lexe["lexcat"], lexe["ss"], lexe["ss2"], include_lexcat, include_supersenses)
+    label = _labels.get(key)
+    if label is None:
+        label = _labels[key] = _makelabel(*key)
+    return label
+
+def _makelabel(lexcat, ss, ss2, include_lexcat, include_supersenses):
     assert include_lexcat or include_supersenses
     if include_lexcat and not include_supersenses:
-        return lexe["lexcat"]
+        return lexcat
 
-    sslabel = makesslabel(lexe)
+    sslabel = makesslabel({'ss': ss, 'ss2': ss2})
     if sslabel:
         sslabel = sslabel.replace('|',':')
 
     if include_supersenses and not include_lexcat:
         return sslabel or ''
     elif include_supersenses and include_lexcat:
-        return lexe["lexcat"] + ('-'+sslabel if sslabel else '')
+        return lexcat + ('-'+sslabel if sslabel else '')
 
 def makelabelmap(sent, include_lexcat=True, include_supersenses=True):
     """List lexical expressions with non-empty lexcat and/or supersense
@@ -108,11 +196,101 @@ def makelabelmap(sent, include_lexcat=True, include_supersenses=True):
     return labels
 
 def render_sent(sent, lexcats=True, supersenses=True):
-    toks = [tok['word'] for tok in sent['toks']]
-    smweGroups = [smwe['toknums'] for smwe in sent['smwes'].values()]
-    wmweGroups = [wmwe['toknums'] for wmwe in sent['wmwes'].values()]
-    labels = makelabelmap(sent, lexcats, supersenses) if lexcats or supersenses else {}
-    return render(toks, smweGroups, wmweGroups, labels)
+    return Renderer().render_sent(sent, lexcats, supersenses)
+
+def render_many(sents, lexcats=True, supersenses=True, mwes=True, label_filter=None):
+    """
+    Render each of the given sentences (in JSON format), generating the strings
+    one at a time. See Renderer.render_sent() for the options.
+    """
+    renderer = Renderer()
+    for sent in sents:
+        yield renderer.render_sent(sent, lexcats, supersenses, mwes, label_filter)
+
+# Markup that may follow a token (and its label, if any), by position of the token
+# in the sentence, in order of preference. Separators starting with _ cannot follow a label.
+_FIRST_SEPS = ((' ', '~ ', '~'), ('_ ', '_'))
+_MIDDLE_SEPS = ((' ', '~ ', '~', ' ~', ' _'), ('_ ', '_'))
+_PENULT_SEPS = ((' ', ' ~', '~', ' _'), ('_',))
+_PAIR_SEPS = ((' ', '~'), ('_',))  # 2-token sentence: no gaps allowed
+
+def _match_markup(rendered, toks):
+    """
+    Find the character spans of the tokens and labels in the rendered string.
+    Returns a pair of lists (token spans, label spans), where a label span is None
+    if the token has no label; or None if the string is not valid markup for the tokens.
+
+    Where tokens or labels contain markup characters, the string may be segmented
+    more than one way. Alternatives are explored depth-first in a fixed order
+    (a label if possible, then the separators in order of preference), and
+    positions already known to be dead ends are not revisited, so the scan is
+    linear in the length of the string in practice.
+
+    >>> _match_markup('a_b|B c', ['a','b','c'])
+    ([(0, 1), (2, 3), (6, 7)], [None, (3, 5), None])
+    >>> _match_markup('a_b|B_c', ['a','b','c']) is None
+    True
+    """
+    n = len(toks)
+    N = len(rendered)
+
+    def successors(i, e):
+        """Ways to continue after token i, which ends at position e:
+        (label span, start of next token or end of string)"""
+        if i==n-1:
+            seps = (('',), ())
+        elif n==2:
+            seps = _PAIR_SEPS
+        elif i==0:
+            seps = _FIRST_SEPS
+        elif i==n-2:
+            seps = _PENULT_SEPS
+        else:
+            seps = _MIDDLE_SEPS
+        options = []
+        if rendered.startswith('|', e):
+            j = e+1
+            while j<N and rendered[j] not in ' _~':
+                j += 1
+            if j>e+1:
+                options.append(((e,j), seps[0]))
+        options.append((None, seps[0]+seps[1]))
+        for lspan, ss in options:
+            a = e if lspan is None else lspan[1]
+            for sep in ss:
+                if i==n-1:
+                    # like regex $, the end of the string may be followed by a single newline
+                    if a==N or (a==N-1 and rendered[a]=='\n'):
+                        yield lspan, N
+                elif rendered.startswith(sep, a):
+                    yield lspan, a+len(sep)
+
+    tspans = [None]*n
+    lspans = [None]*n
+    failed = set() # (token index, start position) pairs that cannot lead to a match
+    stack = []
+
+    def push(i, start):
+        if (i,start) in failed or not rendered.startswith(toks[i], start):
+            return False
+        tspans[i] = (start, start+len(toks[i]))
+        stack.append((i, start, successors(i, start+len(toks[i]))))
+        return True
+
+    if not push(0, 0):
+        return None
+    while stack:
+        i, start, options = stack[-1]
+        for lspan, nxt in options:
+            lspans[i] = lspan
+            if i==n-1:
+                return tspans, lspans
+            if push(i+1, nxt):
+                break
+        else:   # dead end
+            failed.add((i,start))
+            stack.pop()
+    return None
 
 def unrender(rendered, toks):
     """
@@ -140,28 +318,16 @@ def unrender(rendered, toks):
     assert not any((not t) or ' ' in t for t in toks)
 
     """
-    1. Construct a regex to identify which characters belong to tokens, which
+    1. Scan the rendered string to identify which characters belong to tokens, which
     are labels, and which are MWE markup. As we know the tokens, we can avoid
     assumptions about their characters (they may contain _, ~, and |).
     """
-    if len(toks)==1:
-        reMarkup = rf'^(?P<t0>{re.escape(toks[0])})((?P<L0>\|[^ _~]+)?)$'
-    elif len(toks)==2: # no gaps allowed
-        reMarkup = rf'^(?P<t0>{re.escape(toks[0])})((?P<L0>\|[^ _~]+)?[ ~]|_)' \
-                   rf'(?P<t{len(toks)-1}>{re.escape(toks[-1])})(?P<L{len(toks)-1}>\|[^ _~]+)?$'
-    else:
-        reMarkup = rf'^(?P<t0>{re.escape(toks[0])})((?P<L0>\|[^ _~]+)?( |~ ?)|_ ?)'
-        for i in range(1,len(toks)-2):
-            reMarkup += rf'(?P<t{i}>{re.escape(toks[i])})((?P<L{i}>\|[^ _~]+)?( |~ ?| [~_])|_ ?)'
-        reMarkup += rf'(?P<t{len(toks)-2}>{re.escape(toks[-2])})' \
-                    rf'((?P<L{len(toks)-2}>\|[^ _~]+)?( | ?~| _)|_)' \
-                    rf'(?P<t{len(toks)-1}>{re.escape(toks[-1])})(?P<L{len(toks)-1}>\|[^ _~]+)?$'
-    matches = re.match(reMarkup, rendered)
-    if not matches:
+    spans = _match_markup(rendered, toks)
+    if spans is None:
         raise ValueError(f'Invalid markup: {rendered}')
-    groups = matches.groupdict()   # regex named groups, not MWE groups
-    # Groups t0, t1, ..., tn match the tokens
-    # Groups L0, L1, ..., Ln match the supersense/lexcat labels where present
+    tspans, lspans = spans
+    # tspans[i] is the (start, end) of token i
+    # lspans[i] is the (start, end) of the supersense/lexcat label (including |) where present
     # Everything else is markup. Note that this does not fully validate the markup;
     # unclosed gaps are allowed, and labels on strong expressions are optional.
 
@@ -172,24 +338,21 @@ def unrender(rendered, toks):
     """
     ingap = False
     bio_tagging = []
-    labels_at_end = []
     labels_at_beginning = [None]*len(toks)
     initial_token = None    # for the current token, what is the first token position in the same strong expression?
     pregap_initial_token = None # for the strong MWE that contains the current gap, what is its first token position?
 
     for i in range(len(toks)):
-        label = groups[f'L{i}']
-        if label is not None:
-            label = label[1:]
+        label = None if lspans[i] is None else rendered[lspans[i][0]+1:lspans[i][1]]
 
         # l, r = MWE markup/spaces on left and right
         if i==0: l = '^'
         else:
-            l = rendered[matches.end(f'L{i-1}' if labels_at_end[-1] is not None else f't{i-1}'):matches.start(f't{i}')]
+            l = rendered[(lspans[i-1] or tspans[i-1])[1]:tspans[i][0]]
 
         if i==len(toks)-1: r = '$'
         else:
-            r = rendered[matches.end(f'L{i}' if label is not None else f't{i}'):matches.start(f't{i+1}')]
+            r = rendered[(lspans[i] or tspans[i])[1]:tspans[i+1][0]]
 
         assert l in {' ', '_', '~', '_ ', '~ ', ' _', ' ~', '^'},l
         assert r in {' ', '_', '~', '_ ', '~ ', ' _', ' ~', '$'}
@@ -222,7 +385,6 @@ def unrender(rendered, toks):
             pregap_initial_token = initial_token
 
         bio_tagging.append(tag)
-        labels_at_end.append(label)
 
         if label is not None:
             # store the label on the FIRST token in the strong expression
@@ -304,7 +466,137 @@ def test_unrender():
     """
     pass
 
+def test_unrender_random(n=20000, seed=0):
+    """
+    The markup scanner used by unrender() should segment random strings (mostly invalid,
+    with tokens and labels that may contain markup characters) the same way as the original
+    implementation, which constructed a regex for the sentence. Returns the mismatches.
+
+    >>> test_unrender_random()
+    []
+    """
+    import random
+
+    def match_markup_regex(rendered, toks):
+        if len(toks)==1:
+            reMarkup = rf'^(?P<t0>{re.escape(toks[0])})((?P<L0>\|[^ _~]+)?)$'
+        elif len(toks)==2: # no gaps allowed
+            reMarkup = rf'^(?P<t0>{re.escape(toks[0])})((?P<L0>\|[^ _~]+)?[ ~]|_)' \
+                       rf'(?P<t{len(toks)-1}>{re.escape(toks[-1])})(?P<L{len(toks)-1}>\|[^ _~]+)?$'
+        else:
+            reMarkup = rf'^(?P<t0>{re.escape(toks[0])})((?P<L0>\|[^ _~]+)?( |~ ?)|_ ?)'
+            for i in range(1,len(toks)-2):
+                reMarkup += rf'(?P<t{i}>{re.escape(toks[i])})((?P<L{i}>\|[^ _~]+)?( |~ ?| [~_])|_ ?)'
+            reMarkup += rf'(?P<t{len(toks)-2}>{re.escape(toks[-2])})' \
+                        rf'((?P<L{len(toks)-2}>\|[^ _~]+)?( | ?~| _)|_)' \
+                        rf'(?P<t{len(toks)-1}>{re.escape(toks[-1])})(?P<L{len(toks)-1}>\|[^ _~]+)?$'
+        matches = re.match(reMarkup, rendered)
+        if not matches:
+            return None
+        tspans = [matches.span(f't{i}') for i in range(len(toks))]
+        lspans = [matches.span(f'L{i}') if matches.group(f'L{i}') is not None else None for i in range(len(toks))]
+        return tspans, lspans
+
+    rand = random.Random(seed)
+    mismatches = []
+    for _ in range(n):
+        toks = [''.join(rand.choice('ab_~|') for _ in range(rand.randint(1,3))) for _ in range(rand.randint(1,6))]
+        rendered = ''
+        for i,tok in enumerate(toks):
+            rendered += tok
+            if rand.random()<0.3:
+                rendered += '|' + ''.join(rand.choice('AB_~|\n') for _ in range(rand.randint(0,3)))
+            if i<len(toks)-1:
+                rendered += rand.choice([' ', ' ', '_', '~', '_ ', '~ ', ' _', ' ~', '  ', '', '~_'])
+            elif rand.random()<0.1:
+                rendered += rand.choice(['\n', ' ', '_'])
+        if _match_markup(rendered, toks)!=match_markup_regex(rendered, toks):
+            mismatches.append((rendered, toks))
+    return mismatches
+
+def benchmark(corpusFPs, repeat=3):
+    """Compare the time to render the sentences of the given corpus files
+    (.conllulex or .json) with the current vs. the original render() implementation."""
+    from timeit import timeit
+    from conllulex2json import load_sents
+
+    def render_original(ww, sgroups, wgroups, labels={}):
+        """The original render(), which concatenates tuples with sum() (quadratic in sentence length)"""
+        singletonlabels = dict(labels)
+        before = [None]*len(ww)
+        labelafter = ['']*len(ww)
+        after = [None]*len(ww)
+        for group in sgroups:
+            g = sorted(group)
+            for i,j in zip(g[:-1],g[1:]):
+                if j==i+1:
+                    after[i-1] = ''
+                    before[j-1] = '_'
+                else:
+                    after[i-1] = '_'
+                    before[i] = ' '
+                    before[j-1] = '_'
+                    after[j-2] = ' '
+            if g[0] in labels:
+                labelafter[g[-1]-1] = '|'+labels[g[0]]
+                del singletonlabels[g[0]]
+        for i,lbl in singletonlabels.items():
+            assert i-1 not in labelafter
+            labelafter[i-1] = '|'+lbl
+        for group in wgroups:
+            g = sorted(group)
+            for i,j in zip(g[:-1],g[1:]):
+                if j==i+1:
+                    if after[i-1] is None and before[j-1] is None:
+                        after[i-1] = ''
+                        before[j-1] = '~'
+                else:
+                    if after[i-1] is None and before[i] is None:
+                        after[i-1] = '~'
+                        before[i] = ' '
+                    if after[j-2] is None and before[j-1] is None:
+                        before[j-1] = '~'
+                        after[j-2] = ' '
+
+        after = ['' if x is None else x for x in after]
+        before = [' ' if x is None else x for x in before]
+        return ''.join(sum(zip(before,ww,labelafter,after), ())).strip()
+
+    sents = []
+    for corpusFP in corpusFPs:
+        with open(corpusFP, encoding='utf-8') as inF:
+            if corpusFP.endswith('.json'):
+                sents.extend(json.load(inF))
+            else:
+                sents.extend(load_sents(inF))
+
+    # inputs to render(), computed up front so only the rendering itself is timed
+    analyses = [([tok['word'] for tok in sent['toks']],
+                 [smwe['toknums'] for smwe in sent['smwes'].values()],
+                 [wmwe['toknums'] for wmwe in sent['wmwes'].values()],
+                 makelabelmap(sent)) for sent in sents]
+    # a very long sentence, where concatenation with sum() is quadratic
+    n = 5000
+    longSent = (['w']*n, [[i,i+1] for i in range(1,n,10)], [[i,i+2] for i in range(5,n-2,10)], {i: 'X' for i in range(1,n,5)})
+
+    renderer = Renderer()
+    for description, f in [
+            ('render, original', lambda: [render_original(*a) for a in analyses]),
+            ('render', lambda: [render(*a) for a in analyses]),
+            ('render, reusing buffers', lambda: [renderer.render(*a) for a in analyses]),
+            ('render_many (incl. label maps)', lambda: list(render_many(sents))),
+            (f'long sentence ({n} tokens), original', lambda: render_original(*longSent)),
+            (f'long sentence ({n} tokens)', lambda: render(*longSent))]:
+        t = min(timeit(f, number=1) for _ in range(repeat))
+        print(f'{description}: {t:.4f}s', file=sys.stderr)
+
+    assert [render_original(*a) for a in analyses]==list(render_many(sents))
+    assert render_original(*longSent)==render(*longSent)
 
 if __name__=='__main__':
-    import doctest
-    doctest.testmod()
+    if sys.argv[1:2]==['--benchmark']:
+        # ./mwerender.py --benchmark streusle.conllulex [...]
+        benchmark(sys.argv[2:])
+    else:
+        import doctest
+        doctest.testmod()
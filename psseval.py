@@ -4,7 +4,7 @@ import os, sys, fileinput, re, json, argparse
 from collections import defaultdict, Counter
 
 from conllulex2json import load_sents
-from supersenses import coarsen_pss
+from supersenses import get_ss_mapper
 
 """
 Evaluation script for adposition supersense disambiguation (also includes possessives).
@@ -147,7 +147,7 @@ def main(args):
     goldF = args.goldfile
     sysFs = args.sysfile
 
-    ss_mapper = lambda ss: coarsen_pss(ss, args.depth) if ss.startswith('p.') else ss
+    ss_mapper = get_ss_mapper(args.depth)
 
     # Load gold data
     gold_sents = list(load_sents(goldF, ss_mapper=ss_mapper))
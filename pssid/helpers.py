@@ -1,52 +1,70 @@
-class Token:
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from conllureader import TokenLine, field, open_input, parse_meta, read_sentences
+
+class NotConllulexError(Exception):
+    """The gold standard fields of a token are needed, but the input is not in full .conllulex format"""
+
+class Token(TokenLine):
+    """Token line of a .conllu file (or, with conllulex=True, of a .conllulex file, which has 19 fields);
+    fields consisting of underscores are None"""
+    __slots__ = ("index",) # position in the sentence's tokens
+
+    offset, word, lemma, ud_pos, ptb_pos, morph, head, deprel = [field(i, underscore_as_none=True) for i in range(8)] # 1.-8.
+    deps, misc, smwe, lexcat, lexlemma, ss, ss2, wmwe, wlemma, wcat, lextag = [field(i, underscore_as_none=True) for i in range(8, 19)] # 9.-19.
+
     def __init__(self, string, conllulex=False):
-        self.fields = string.split("\t")
-        self.offset, \
-            self.word, \
-            self.lemma, \
-            self.ud_pos, \
-            self.ptb_pos, \
-            self.morph, \
-            self.head, \
-            self.deprel = [field if field.strip("_") else None for field in self.fields[:8]] # 1.-8.
-        if conllulex:
-            self.deps, \
-                self.misc, \
-                self.smwe, \
-                self.lexcat, \
-                self.lexlemma, \
-                self.ss, \
-                self.ss2, \
-                self.wmwe, \
-                self.wlemma, \
-                self.wcat, \
-                self.lextag = [field if field.strip("_") else None for field in self.fields[8:19]] # 9.-19.
-        self.orig = string
-        self.checkmark = ""
+        TokenLine.__init__(self, string)
+        tabs = string.count("\t")
+        if tabs < 7:
+            raise ValueError("too few fields in line: " + string)
+        if conllulex and tabs < 18:
+            raise NotConllulexError("too few fields for .conllulex in line: " + string)
+
+    @property
+    def head_index(self):
+        """Position of the head in the sentence's tokens (-1 for the root)"""
+        head = self.head
+        return int(head)-1 if head else None
 
 class Sentence:
-    def __init__(self, tokens, meta):
+    def __init__(self, tokens, meta, offset=None):
         self.tokens = tokens
         self.meta = meta
-        self.meta_dict = {}
-        for meta_info in meta:
-            k, v = meta_info.strip("# ").split(" = ")
-            self.meta_dict[k] = v
-
-def sentences(filename, conllulex=False):
-    tokens, meta = [], []
-    f = open(filename, encoding='utf-8') if type(filename) == str else filename
-    for line in f:
-        line = line.strip()
-        if not line:
-            yield Sentence(tokens, meta)
-            tokens = []
-            meta = []
-        elif line.startswith("#"):
-            meta.append(line)
-        else:
-            tokens.append(Token(line, conllulex=conllulex))
-    f.close()
-
-    if tokens:
-        yield Sentence(tokens, meta)
+        self.offset = offset # byte offset in the input, if read with offsets=True
+        for index, token in enumerate(tokens):
+            token.index = index
+        self._children = None
+        self._lemmas = None
+        self._meta_dict = None
+
+    @property
+    def children(self):
+        """HEAD field value -> tokens with that head, in order"""
+        if self._children is None:
+            self._children = {}
+            for token in self.tokens:
+                self._children.setdefault(token.head, []).append(token)
+        return self._children
+
+    @property
+    def lemmas(self):
+        if self._lemmas is None:
+            self._lemmas = {token.lemma for token in self.tokens}
+        return self._lemmas
+
+    @property
+    def meta_dict(self):
+        if self._meta_dict is None:
+            self._meta_dict = parse_meta(self.meta)
+        return self._meta_dict
+
+def sentences(filename, conllulex=False, offsets=False):
+    if offsets:
+        for offset, meta, lines in read_sentences(filename, offsets=True):
+            yield Sentence([Token(line, conllulex=conllulex) for line in lines], meta, offset)
+    else:
+        for meta, lines in read_sentences(filename):
+            yield Sentence([Token(line, conllulex=conllulex) for line in lines], meta)
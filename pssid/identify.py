@@ -1,13 +1,19 @@
+import os
 import sys
 import argparse
 import re
 import json
+import pickle
+import hashlib
+import io
+import itertools
+import multiprocessing
 
-from collections import defaultdict
+from collections import defaultdict, deque, namedtuple
 from operator import itemgetter
 
-import tags2sst
 from helpers import *
+import mwerender
 
 PREPS_MASTER = {"a", "abaft", "aboard", "about", "above", "abreast", "abroad", "absent", "across",
                     "adrift", "afore", "aft", "after", "afterward", "afterwards", "against", "agin", "ago",
@@ -78,15 +84,48 @@ PREP_SPECIAL_MW_BEGINNERS = ["a", "according", "all", "bare", "because", "but",
                              "subsequent", "such", "thanks", "this"]
 
 
-
-def train(infile, args):
-    
+MWE, ANTI_MWE = 1, 2 # flags of entries in a LemmaTrie
+
+class LemmaTrie:
+    """Lexicons of (prepositional and non-prepositional) multiword expressions,
+    compiled into a trie over lemmas so that the longest entry starting at a token
+    is found in a single left-to-right walk."""
+
+    def __init__(self, mwes=(), anti_mwes=(), root=None):
+        self.root = [0, {}] if root is None else root # node: [flags, children by lemma]
+        for entries, flag in ((mwes, MWE), (anti_mwes, ANTI_MWE)):
+            for entry in entries:
+                lemmas = entry.split(" ")
+                if len(lemmas) >= 2:
+                    self.add(lemmas, flag)
+
+    def add(self, lemmas, flag):
+        node = self.root
+        for lemma in lemmas:
+            node = node[1].setdefault(lemma, [0, {}])
+        node[0] |= flag
+
+    def longest_match(self, lemmas, start, end):
+        """Return (j, flags) for the longest entry lemmas[start:j] with j <= end and at least two lemmas,
+        or (None, 0) if there is none"""
+        match = None, 0
+        node = self.root
+        for j in range(start, end):
+            node = node[1].get(lemmas[j])
+            if node is None:
+                break
+            if node[0] and j-start >= 1:
+                match = j+1, node[0]
+        return match
+
+
+def collect_counts(infile):
+    """Count the candidate entries of the lists of a model in a training file. Return, for each list
+    ("p_mwe", "non_p_mwe", "advcl", "acl"), (entry, count) pairs, most frequent first."""
     mwe_dict = defaultdict(lambda: defaultdict(int))
-    lemma_pos_counts = defaultdict(lambda: defaultdict(int))
     advcl_dict = defaultdict(lambda: defaultdict(int))
     acl_dict = defaultdict(lambda: defaultdict(int))
-    swes = defaultdict(int)
-    
+
     for sent in sentences(infile, conllulex=True):
         for token in sent.tokens:
             if token.lexlemma:
@@ -95,16 +134,10 @@ def train(infile, args):
                         mwe_dict["+p"][token.lexlemma] += 1
                     else:
                         mwe_dict["-p"][token.lexlemma] += 1
-                elif token.ss and token.ss[0].lower() == "p":
-                    swes[token.lemma] += 1
-                
-            lemma_pos_counts[token.lemma][token.ud_pos] += 1
-            lemma_pos_counts[token.lemma][token.ptb_pos] += 1
 
             if token.ptb_pos == "TO":
-                head = sent.tokens[int(token.head)-1]
-                matrix = sent.tokens[int(head.head)-1]
-                head_has_dir_obj = any(t.head == head.head and t.deprel == "obj" for t in sent.tokens)
+                head = sent.tokens[token.head_index]
+                matrix = sent.tokens[head.head_index]
                 true = token.ss and token.ss[0].lower() == "p"
                 
                 if head.deprel == "advcl":
@@ -119,35 +152,108 @@ def train(infile, args):
                     else:
                         acl_dict["-p"][matrix.lemma] += 1
 
-    prep_mwe_list = [k for k, v in sorted(mwe_dict["+p"].items(), key=itemgetter(1), reverse=True) if v >= args.p_mwe_min]
-    non_prep_mwe_list = []
-    non_prep_mwe_list = [k for k, v in sorted(mwe_dict["-p"].items(), key=itemgetter(1), reverse=True) if v >= args.non_p_mwe_min]
-    advcl_list = [k for k, v in sorted(advcl_dict["-p"].items(), key=itemgetter(1), reverse=True) if v >= args.advcl_min]
-    acl_list = [k for k, v in sorted(acl_dict["-p"].items(), key=itemgetter(1), reverse=True) if v >= args.acl_min]
+    return {"p_mwe": sorted(mwe_dict["+p"].items(), key=itemgetter(1), reverse=True),
+            "non_p_mwe": sorted(mwe_dict["-p"].items(), key=itemgetter(1), reverse=True),
+            "advcl": sorted(advcl_dict["-p"].items(), key=itemgetter(1), reverse=True),
+            "acl": sorted(acl_dict["-p"].items(), key=itemgetter(1), reverse=True)}
+
+def model_from_counts(counts, p_mwe_min, non_p_mwe_min, advcl_min, acl_min):
+    """Return the model keeping the entries counted by collect_counts() that reach the given thresholds"""
+    thresholds = {"p_mwe": p_mwe_min, "non_p_mwe": non_p_mwe_min, "advcl": advcl_min, "acl": acl_min}
+    return {key: [k for k, v in counts[key] if v >= thresholds[key]] for key in ("p_mwe", "non_p_mwe", "advcl", "acl")}
 
-    model = {"p_mwe": prep_mwe_list, "non_p_mwe": non_prep_mwe_list, "advcl": advcl_list, "acl": acl_list} # , "lemma_pos": lemma_pos_counts
+def train(infile, args):
+    model = model_from_counts(collect_counts(infile), args.p_mwe_min, args.non_p_mwe_min, args.advcl_min, args.acl_min)
 
-    outfile = args.model_out if args.model_out else infile.split("/")[-1] + ".p{}-P{}-advcl{}-acl{}.model".format(args.p_mwe_min, args.non_p_mwe_min, args.advcl_min, args.acl_min)
-    
-    json.dump(model, open(outfile, "w", encoding='utf-8'), indent=2)
+    outfile = args.model_out if args.model_out else ("stdin" if infile == "-" else infile.split("/")[-1]) + ".p{}-P{}-advcl{}-acl{}.{}".format(args.p_mwe_min, args.non_p_mwe_min, args.advcl_min, args.acl_min, "cmodel" if args.compiled else "model")
+
+    save_model(model, outfile, compiled=args.compiled)
 
     return model
 
 
+def build_lexicon(model, mwe_list_file=None, mwe_anti_list_file=None):
+    """Compile the MWE lexicons of a model (or the lists of MWEs and excluded MWEs read from the given files) for lookup"""
+    mwe_list = set()
+    if mwe_list_file:
+        with open(mwe_list_file, encoding='utf-8') as f:
+            for line in f:
+                mwe_list.add(line.strip().split("\t")[0].strip())
+    elif "p_mwe" in model:
+        mwe_list = set(model["p_mwe"]).union(set(PREPS_MASTER))
+    else:
+        mwe_list = PREPS_MASTER
+
+    non_prep_mwe_list = set()
+    if mwe_anti_list_file:
+        with open(mwe_anti_list_file, encoding='utf-8') as f:
+            for line in f:
+                non_prep_mwe_list.add(line.strip().split("\t")[0].strip())
+    elif "non_p_mwe" in model:
+        non_prep_mwe_list = model["non_p_mwe"]
+
+    return {"max_mwe_length": max(len(w.split()) for w in mwe_list),
+            "mw_beginners": frozenset([w.split()[0] for w in list(mwe_list)+list(non_prep_mwe_list) if len(w.split()) >= 2]).union(PREP_SPECIAL_MW_BEGINNERS),
+            "trie": LemmaTrie(mwe_list, non_prep_mwe_list).root}
+
 
+# Compiled models are pickled, preceded by a header with the format version and the SHA-256 of the pickle.
+# The version must be incremented whenever the compiled representation (or PREPS_MASTER) changes.
+MODEL_MAGIC = b"pssid-compiled-model\n"
+MODEL_VERSION = 1
 
-def print_target(token, sentence, index, checkmark, lexcat, context):
+def compile_model(model):
+    """Return a copy of a model with lookup structures precomputed: frozen sets of advcl and acl heads,
+    and the compiled MWE lexicon"""
+    return dict(model, advcl=frozenset(model["advcl"]), acl=frozenset(model["acl"]), lexicon=build_lexicon(model))
+
+def save_model(model, outfile, compiled=False):
+    if compiled:
+        payload = pickle.dumps(compile_model(model), protocol=pickle.HIGHEST_PROTOCOL)
+        with open(outfile, "wb") as f:
+            f.write(MODEL_MAGIC)
+            f.write("{} {}\n".format(MODEL_VERSION, hashlib.sha256(payload).hexdigest()).encode("ascii"))
+            f.write(payload)
+    else:
+        model = {k: sorted(v) if isinstance(v, frozenset) else v for k, v in model.items() if k != "lexicon"}
+        json.dump(model, open(outfile, "w", encoding='utf-8'), indent=2)
+
+def load_model(filename):
+    """Load a model in JSON or compiled format (only load compiled models from trusted sources:
+    unpickling can execute arbitrary code)"""
+    with open(filename, "rb") as f:
+        data = f.read()
+    if not data.startswith(MODEL_MAGIC):
+        return json.loads(data.decode("utf-8"))
+    header, _, payload = data[len(MODEL_MAGIC):].partition(b"\n")
+    version, digest = header.decode("ascii").split()
+    if int(version) != MODEL_VERSION:
+        raise ValueError("{}: compiled model format version {} is not supported by this version of identify.py (expected {}); recompile the model".format(filename, version, MODEL_VERSION))
+    if hashlib.sha256(payload).hexdigest() != digest:
+        raise ValueError("{}: compiled model is corrupt (checksum mismatch)".format(filename))
+    return pickle.loads(payload)
+
+
+
+
+def print_target(token, sentence, marks, index, lexcat, context, out=None):
     for cont in range(context, 0, -1):
         if index-cont >=0:
             tok = sentence.tokens[index-cont]
-            print("-{}\t{}".format(tok.orig, tok.checkmark))
-    print((":" if context else "")+"{}\t{}".format(token.orig, checkmark)+("\t{}".format(lexcat) if lexcat else ""))
+            print("-{}\t{}".format(tok.orig, marks[index-cont]), file=out)
+    print((":" if context else "")+"{}\t{}".format(token.orig, marks[index])+("\t{}".format(lexcat) if lexcat else ""), file=out)
+    # following tokens are shown as they were when the target was reached:
+    # unmarked, unless they continue an MWE that begins at or before the target
+    n_mwes = sum(1 for mark in marks[:index+1] if mark.endswith("**"))
     for cont in range(1, context+1):
         if index+cont < len(sentence.tokens):
             tok = sentence.tokens[index+cont]
-            print("-{}\t{}".format(tok.orig, tok.checkmark))
+            mark = marks[index+cont]
+            if not (mark[:1].isdigit() and not mark.endswith("**") and int(mark.split(":")[0]) <= n_mwes):
+                mark = ""
+            print("-{}\t{}".format(tok.orig, mark), file=out)
     if context:
-        print()
+        print(file=out)
 
 def heuristicADP(token):
     if token.ud_pos == "ADP" and token.lemma in PREPS_MASTER and token.ptb_pos != "RP":
@@ -159,7 +265,6 @@ def heuristicPossessive(token, sentence):
     if token.ptb_pos in {"PRP$", "WP$"}:
         return "PRON:POSS_*"
     elif token.ptb_pos == "POS":
-        head = sentence.tokens[int(token.head)-1]
         return "POS_*"
     return ""
 
@@ -177,14 +282,14 @@ def heuristicADV(token):
 
 def heuristicTO(token, sentence, model):
     if token.ptb_pos == "TO":
-        head = sentence.tokens[int(token.head)-1]
-        matrix = sentence.tokens[int(head.head)-1]
-        head_has_dir_obj = any(t.head == head.head and t.deprel == "obj" for t in sentence.tokens)
+        head = sentence.tokens[token.head_index]
+        matrix = sentence.tokens[head.head_index]
         if head.deprel == "advcl":
-            if any(t.head == token.head and t.lemma == "for" for t in sentence.tokens):
+            if any(t.lemma == "for" for t in sentence.children[token.head]):
                 return "for_X_TO_*"
             if matrix.ud_pos == "ADJ":
-               if any(t.head == matrix.offset and t.lemma == "too" or t.lemma == "enough" for t in sentence.tokens):
+               # "too" must modify the matrix adjective, "enough" may occur anywhere in the sentence
+               if any(t.lemma == "too" for t in sentence.children.get(matrix.offset, ())) or "enough" in sentence.lemmas:
                    return "Comparative_TO_*"
             elif matrix.lemma not in model["advcl"]:
                 return "not_in_advcl_anti_list_TO_*"
@@ -194,175 +299,134 @@ def heuristicTO(token, sentence, model):
 
 def heuristicForXTo(token, sentence):
     if token.head:
-        head = sentence.tokens[int(token.head)-1]
+        head = sentence.tokens[token.head_index]
         if head.deprel == "advcl" and token.lemma == "for" and \
-           any(t.head == token.head and t.ptb_pos == "TO" for t in sentence.tokens[int(token.offset):]):
+           any(t.ptb_pos == "TO" and t.index >= int(token.offset) for t in sentence.children[token.head]):
             return "FOR_X_to"
     return ""
 
-def identify(model, args):
-
-    infile = args.file
-    mwe = args.mwe
-    evl = args.eval
-
-    mwe_list = set()
-    if args.mwe_list:
-        with open(args.mwe_list, encoding='utf-8') as f:
-            for line in f:
-                mwe_list.add(line.strip().split("\t")[0].strip())
-    elif "p_mwe" in model:
-        mwe_list = set(model["p_mwe"]).union(set(PREPS_MASTER))
-    else:
-        mwe_list = PREPS_MASTER
+Identification = namedtuple("Identification", "marks mwes lexcats")
+Identification.__doc__ = """Targets identified in a sentence.
 
-    non_prep_mwe_list = set()
-    if args.mwe_anti_list:
-        with open(args.mwe_anti_list, encoding='utf-8') as f:
-            for line in f:
-                non_prep_mwe_list.add(line.strip().split("\t")[0].strip())
-    elif "non_p_mwe" in model:
-        non_prep_mwe_list = model["non_p_mwe"]
+marks: for each token of the sentence, "*" (single-word target), "N:1**" (first token of the Nth MWE
+       of the sentence, a target), "N:M" (Mth token of the Nth MWE), or "-"
+mwes: the MWEs, as lists of token offsets (IDs)
+lexcats: for each token, the lexical category of the target it begins, or an empty string"""
 
-    tp, fp, fn, tn = 0, 0, 0, 0
-    
-    lemma_pos_counts = {}
-    for sent in sentences(infile):
-        for token in sent.tokens:
-            if token.lemma not in lemma_pos_counts:
-                lemma_pos_counts[token.lemma] = defaultdict(int)
-            lemma_pos_counts[token.lemma][token.ud_pos] += 1
-            lemma_pos_counts[token.lemma][token.ptb_pos] += 1
-        
-    max_mwe_length = max(len(w.split()) for w in mwe_list)
-    print("max MWE length={}".format(max_mwe_length), file=sys.stderr)
-    mw_beginners = set([w.split()[0] for w in list(mwe_list)+list(non_prep_mwe_list) if len(w.split()) >= 2]).union(set(PREP_SPECIAL_MW_BEGINNERS))
+class Identifier:
+    """Heuristic identifier of adpositional targets, for a loaded model.
 
-    for si, sent in enumerate(sentences(infile, conllulex=(evl or args.tp or args.fp or args.fn or args.tn)), start=1):
-        if not (args.sst or evl or args.tp or args.fp or args.fn or args.tn):
-            for metaline in sent.meta:
-                print(metaline)
+    Identifier(model).identify_sentence(sentence) returns the Identification of a Sentence
+    without modifying it; an Identifier can be reused for any number of sentences."""
 
+    def __init__(self, model, mwe=True, mwe_list=None, mwe_anti_list=None):
+        """Use the model (as returned by load_model() or train()), looking for MWEs if mwe is true;
+        mwe_list and mwe_anti_list are optional files overriding the model's lexicons"""
+        self.model = model
+        self.mwe = mwe
+        if "lexicon" in model and not (mwe_list or mwe_anti_list):
+            self.lexicon = model["lexicon"]
+        else:
+            self.lexicon = build_lexicon(model, mwe_list, mwe_anti_list)
+        self.max_mwe_length = self.lexicon["max_mwe_length"]
+        self.mw_beginners = self.lexicon["mw_beginners"]
+        self.mwe_trie = LemmaTrie(root=self.lexicon["trie"])
+
+    def identify_sentence(self, sentence, skip_unclear=False):
+        """Return the Identification of the sentence. If skip_unclear is true, tokens whose gold supersense
+        is ?? are not considered as targets (as in evaluation; requires full .conllulex format, otherwise
+        NotConllulexError is raised)."""
+        tokens = sentence.tokens
+        length = len(tokens)
+        lemmas = [t.lemma for t in tokens]
+        marks = [""] * length
+        lexcats = [""] * length
         mwes = []
-        mwe_counter = 1
-        current_mwe = []
-
-        length = len(sent.tokens)
-        i = 0
-        k = 0        
-        while i < length:
-            token = sent.tokens[i]
+
+        k = 0 # tokens before k are part of an MWE (or of an excluded MWE) found earlier
+        for i, token in enumerate(tokens):
             lexcat = ""
-            if (evl or args.tp or args.fp or args.fn or args.tn):
+            unclear = False
+            if skip_unclear:
                 try:
-                    xlemma = token.fields[12]
-                    supersense = token.fields[13]
-                except IndexError as e:
-                    print("NOTE: the --eval, --tp, --fp, --fn, --tn options works ONLY with full .conllulex format", file=sys.stderr)
-                    sys.exit(1)
+                    unclear = token.fields[13] == "??"
+                except IndexError:
+                    raise NotConllulexError("the supersense of each token is needed: input must be in full .conllulex format")
 
-            t = False
-            if (evl or args.tp or args.fp or args.fn or args.tn) and re.match("^p", supersense):
-                t = True
-
-            lemma = token.lemma
             skip = False
-            if i>=k and (not (evl or args.tp or args.fp or args.fn or args.tn) or supersense != "??"):
-                if mwe and token.lemma in mw_beginners:
-                    for j in range(min(length, i+max_mwe_length)-1, i+1, -1):
-                        ngram = [t for t in sent.tokens[i:j]]
-                        ngram_lemma = " ".join([t.lemma for t in ngram])
-                        if ngram_lemma in non_prep_mwe_list:
-                            skip = True
-                            k = j
-                            break
-                        if ngram_lemma in mwe_list: # find the longest possible mwe
-                            mwes.append([int(t.offset) for t in ngram])
-                            token.checkmark = "{}:{}".format(mwe_counter, 1) + "**"
-                            lemma = ngram_lemma
-                            for current_mwe_counter, tok in enumerate(ngram[1:], start=2):
-                                sent.tokens[int(tok.offset)-1].checkmark = "{}:{}".format(mwe_counter, current_mwe_counter)
-                            if ngram[-1].ud_pos in ("ADP", "SCONJ"):
-                                lexcat = "P"
-                            else:
-                                lexcat = "PP"
-                            mwe_counter += 1
-                            k = j
-                            break
-
-                if not token.checkmark and not skip:
-                    token.checkmark += heuristicADP(token) \
-                                       + heuristicPossessive(token, sent) \
-                                       + heuristicSCONJ(token, model) \
-                                       + heuristicADV(token) \
-                                       + heuristicTO(token, sent, model) \
-                                       + heuristicForXTo(token, sent)
-                    
-            first_in_mwe = False
-            if token.checkmark.endswith("*"):
-                if token.checkmark.endswith("**"):
-                    first_in_mwe = True
-                else:
-                    token.checkmark = "*"
+            if i>=k and not unclear:
+                if self.mwe and token.lemma in self.mw_beginners:
+                    # find the longest possible mwe (the last token of the sentence is never included)
+                    j, flags = self.mwe_trie.longest_match(lemmas, i, min(length, i+self.max_mwe_length)-1)
+                    if flags & ANTI_MWE:
+                        skip = True
+                        k = j
+                    elif flags & MWE:
+                        mwes.append([int(t.offset) for t in tokens[i:j]])
+                        marks[i] = "{}:{}".format(len(mwes), 1) + "**"
+                        for m in range(i+1, j):
+                            marks[m] = "{}:{}".format(len(mwes), m-i+1)
+                        if tokens[j-1].ud_pos in ("ADP", "SCONJ"):
+                            lexcat = "P"
+                        else:
+                            lexcat = "PP"
+                        k = j
+
+                if not marks[i] and not skip:
+                    marks[i] = self.heuristics(token, sentence)
+
+            if marks[i].endswith("*"):
+                if not marks[i].endswith("**"):
+                    marks[i] = "*"
                     lexcat = {'PRP$': 'PRON.POSS', 'WP$': 'PRON.POSS', 'POS': 'POSS', 'TO': 'INF.P'}.get(token.ptb_pos, "P")
-            elif not (token.checkmark and token.checkmark[0].isdigit()):
-                token.checkmark = "-"
+            elif not (marks[i] and marks[i][0].isdigit()):
+                marks[i] = "-"
+            lexcats[i] = lexcat
 
-            if not args.lexcat:
-                lexcat = ""
-                
-            if token.checkmark == "*" or first_in_mwe:
-                if t:
-                    # exact match
-                    if token.lexlemma == lemma:
-                        if args.tp and not evl:
-                            print_target(token, sent, i, token.checkmark, lexcat, args.context)
-                        tp += 1
-                    else:
-                        if args.fp and not evl:
-                            print_target(token, sent, i, token.checkmark, lexcat, args.context)
-                        fp += 1
-                        if args.fn and not evl:
-                            print_target(token, sent, i, token.checkmark, lexcat, args.context)
-                        fn += 1
-                else:
-                    if args.fp and not evl:
-                        print_target(token, sent, i, token.checkmark, lexcat, args.context)
-                    fp += 1
-            else:
-                if t:
-                    if args.fn and not evl:
-                        print_target(token, sent, i, token.checkmark, lexcat, args.context)
-                    fn += 1
-                else:
-                    if args.tn and not evl:
-                        print_target(token, sent, i, token.checkmark, lexcat, args.context)
-                    tn += 1
+        return Identification(marks, mwes, lexcats)
 
-            if not (args.sst or evl or args.tp or args.fp or args.fn or args.tn):
-                print("{}\t{}".format(token.orig, token.checkmark) + ("\t{}".format(lexcat) if lexcat else ""))
+    def heuristics(self, token, sentence):
+        model = self.model
+        return heuristicADP(token) \
+               + heuristicPossessive(token, sentence) \
+               + heuristicSCONJ(token, model) \
+               + heuristicADV(token) \
+               + heuristicTO(token, sentence, model) \
+               + heuristicForXTo(token, sentence)
 
-            i += 1
 
-        if args.sst:
-            _json = {}
-            _json["words"] = []
-            _json["lemmas"] = []
-            _json["tags"] = []
-            _json["labels"] = {}
-            _json["_"] = mwes
-            _json["~"] = []
-            _sent = []
-            for tok in sent.tokens:
-                _sent.append(tok.word)
-                _json["words"].append([tok.word, tok.ptb_pos])
-                _json["lemmas"].append(tok.lemma)
-                if tok.checkmark.endswith("*"):
-                    _json["labels"][tok.offset] = [tok.word, "Locus"]
-            print("{}\t{}\t{}".format(sent.meta_dict.get("sent_id", args.file.split("/")[-1].rsplit(".", maxsplit=1)[0]+"."+str(si)), tags2sst.render(_sent, _json["_"], []).decode("utf-8"), json.dumps(_json)))
-
-        elif not (evl or args.tp or args.fp or args.fn or args.tn):
-            print()
+def identify(model, args):
+
+    infile = args.file
+    evl = args.eval
+
+    identifier = Identifier(model, mwe=args.mwe, mwe_list=args.mwe_list, mwe_anti_list=args.mwe_anti_list)
+
+    tp, fp, fn, tn = 0, 0, 0, 0
+
+    print("max MWE length={}".format(identifier.max_mwe_length), file=sys.stderr)
+
+    conllulex = bool(evl or args.tp or args.fp or args.fn or args.tn or args.error_index)
+    out = SSTWriter() if args.sst else sys.stdout
+    error_index = ErrorIndexWriter(args.error_index, infile) if args.error_index else None
+    try:
+        if args.jobs > 1:
+            results = identify_parallel(identifier, args, conllulex)
+        else:
+            results = identify_serial(identifier, args, conllulex, out)
+        for output, counts, records in results:
+            if output:
+                out.write(output)
+            if error_index:
+                error_index.write(records)
+            tp, fp, fn, tn = tp+counts[0], fp+counts[1], fn+counts[2], tn+counts[3]
+    except NotConllulexError:
+        out.flush()
+        print("NOTE: the --eval, --tp, --fp, --fn, --tn options works ONLY with full .conllulex format", file=sys.stderr)
+        sys.exit(1)
+    out.flush()
+    if error_index:
+        error_index.close()
 
     if evl:
         print("\tgold+\tgold-")
@@ -375,58 +439,346 @@ def identify(model, args):
         print("\nP\tR\tF")
         print("{}\t{}\t{}".format(p, r, f))
 
-        
+
+def score_identified(sent, identification):
+    """Compare the Identification of a sentence to its gold standard annotation (full .conllulex format).
+    Return the outcomes for each token: ("tp",), ("fp",), ("fn",), ("tn",), or ("fp", "fn") for
+    a target that does not exactly match the gold target at the token."""
+    marks, mwes, lexcats = identification
+    result = []
+    for i, token in enumerate(sent.tokens):
+        first_in_mwe = marks[i].endswith("**")
+        t = bool(re.match("^p", token.fields[13]))
+
+        if marks[i] == "*" or first_in_mwe:
+            if t:
+                if first_in_mwe:
+                    mwe_length = len(mwes[int(marks[i].split(":")[0])-1])
+                    lemma = " ".join(tok.lemma for tok in sent.tokens[i:i+mwe_length])
+                else:
+                    lemma = token.lemma
+                # exact match
+                result.append(("tp",) if token.lexlemma == lemma else ("fp", "fn"))
+            else:
+                result.append(("fp",))
+        else:
+            result.append(("fn",) if t else ("tn",))
+    return result
+
+def print_identified(sent, si, identification, args, out, records=None):
+    """Print the Identification of a sentence (the si-th in the input) to out in the format selected by args;
+    return the evaluation counts [tp, fp, fn, tn] for the sentence. If records is a list, the sentence's
+    record for the error index (see ErrorIndexWriter) is appended to it."""
+    evl = args.eval
+    diagnose = evl or args.tp or args.fp or args.fn or args.tn
+    marks, mwes, lexcats = identification
+    tp, fp, fn, tn = 0, 0, 0, 0
+
+    if not (args.sst or diagnose):
+        for metaline in sent.meta:
+            print(metaline, file=out)
+
+    if diagnose or records is not None:
+        scores = score_identified(sent, identification)
+    if records is not None:
+        records.append((sent.meta_dict.get("sent_id", str(si)), sent.offset, marks,
+                        [(i, sent.tokens[i].offset, outcome, lexcats[i]) for i, outcomes in enumerate(scores) for outcome in outcomes]))
+
+    if diagnose:
+        shown = {"tp": args.tp, "fp": args.fp, "fn": args.fn, "tn": args.tn}
+        counts = {"tp": 0, "fp": 0, "fn": 0, "tn": 0}
+        for i, outcomes in enumerate(scores):
+            for outcome in outcomes:
+                if shown[outcome] and not evl:
+                    print_target(sent.tokens[i], sent, marks, i, lexcats[i] if args.lexcat else "", args.context, out)
+                counts[outcome] += 1
+        tp, fp, fn, tn = counts["tp"], counts["fp"], counts["fn"], counts["tn"]
+
+    for i, token in enumerate(sent.tokens):
+        lexcat = lexcats[i] if args.lexcat else ""
+        if not (args.sst or diagnose):
+            print("{}\t{}".format(token.orig, marks[i]) + ("\t{}".format(lexcat) if lexcat else ""), file=out)
+
+    if args.sst:
+        sent_id = sent.meta_dict.get("sent_id", args.file.split("/")[-1].rsplit(".", maxsplit=1)[0]+"."+str(si))
+        out.write(sst_line(sent_id, sent, marks, mwes, lambda tok: "Locus"))
+
+    elif not diagnose:
+        print(file=out)
+
+    return [tp, fp, fn, tn]
+
+
+def sst_line(sent_id, sent, marks, mwes, label, rendered=None):
+    """Format a sentence as a line of .sst output: the sentence ID, the sentence with its MWEs marked up
+    (rendered with mwerender.render() unless given), and a JSON object with the words, lemmas, MWEs,
+    and the label of each target (a token whose mark ends with "*"), as returned by label(token).
+    MWEs are given as lists of token IDs, which are not positions in the tokens if the sentence
+    has multiword token lines:
+
+    >>> lines = ["1-2\\tdon't" + "\\t_"*8, "1\\tdo\\tdo\\tAUX" + "\\t_"*6, "2\\tn't\\tnot\\tPART" + "\\t_"*6,
+    ...          "3\\tgive\\tgive\\tVERB" + "\\t_"*6, "4\\tup\\tup\\tADP" + "\\t_"*6]
+    >>> sent = Sentence([Token(line) for line in lines], [])
+    >>> sst_line("s1", sent, ["-", "-", "-", "1:1", "1:2**"], [[3, 4]], lambda tok: "Locus").split("\\t")[1]
+    "don't do n't give_up"
+    """
+    tokens = sent.tokens
+    words = [tok.word for tok in tokens]
+    if rendered is None:
+        positions = {int(tok.offset): i for i, tok in enumerate(tokens, start=1) if tok.offset.isdigit()}
+        rendered = mwerender.render(words, [[positions[t] for t in mwe] for mwe in mwes], [])
+    _json = {"words": [[word, tok.ptb_pos] for word, tok in zip(words, tokens)],
+             "lemmas": [tok.lemma for tok in tokens],
+             "tags": [],
+             "labels": {tok.offset: [word, label(tok)] for word, tok, mark in zip(words, tokens, marks) if mark.endswith("*")},
+             "_": mwes,
+             "~": []}
+    return "{}\t{}\t{}\n".format(sent_id, rendered, json.dumps(_json))
+
+SST_BATCH_SIZE = 1000 # lines encoded and written at a time by SSTWriter
+
+class SSTWriter:
+    """Collects lines of .sst output and writes them to a binary stream (by default, standard output)
+    in batches, encoding each batch as UTF-8 at once"""
+
+    def __init__(self, stream=None, batch_size=SST_BATCH_SIZE):
+        if stream is None:
+            sys.stdout.flush()
+            stream = sys.stdout.buffer
+        self.stream = stream
+        self.batch_size = batch_size
+        self.batch = []
+
+    def write(self, text):
+        self.batch.append(text)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            self.stream.write("".join(self.batch).encode("utf-8"))
+            self.batch = []
+        self.stream.flush()
+
+
+class ErrorIndexWriter:
+    """Writes the outcome of each token of the input (as scored by score_identified()) to an error index file,
+    which view_errors.py reads to show targets of any class without identifying them again.
+
+    The error index is a tab-separated text file. After a header line with the path of the input file,
+    each sentence has a record
+        S   sentence ID   byte offset of the sentence in the (decompressed) input   marks (space-separated)
+    followed by a record for each outcome of each of its tokens
+        E   token index in the sentence   token offset   outcome (tp, fp, fn, or tn)   lexcat"""
+
+    HEADER = "# pssid error index for "
+
+    def __init__(self, filename, input_file):
+        self.f = open(filename, "w", encoding="utf-8")
+        self.f.write(self.HEADER + os.path.abspath(input_file) + "\n")
+
+    def write(self, records):
+        """Write the records of consecutive sentences, as built by print_identified()
+        for sentences read with their byte offsets (see helpers.sentences())"""
+        lines = []
+        for sent_id, offset, marks, outcomes in records:
+            lines.append("S\t{}\t{}\t{}\n".format(sent_id, offset, " ".join(marks)))
+            lines.extend("E\t{}\t{}\t{}\t{}\n".format(i, offset, outcome, lexcat or "") for i, offset, outcome, lexcat in outcomes)
+        self.f.writelines(lines)
+
+    def close(self):
+        self.f.close()
+
+
+def identify_serial(identifier, args, conllulex, out):
+    """Identify targets sentence by sentence, printing them to out; yield (None, counts, error index records)
+    for each sentence (the records are None unless args.error_index is given)"""
+    for si, sent in enumerate(sentences(args.file, conllulex=conllulex, offsets=bool(args.error_index)), start=1):
+        records = [] if args.error_index else None
+        counts = print_identified(sent, si, identifier.identify_sentence(sent, skip_unclear=conllulex), args, out, records)
+        yield None, counts, records
+
+
+CHUNK_SIZE = 256 # sentences per task in parallel mode
+
+def sentence_chunks(sents, size=CHUNK_SIZE):
+    """Group (byte offset, metadata lines, token lines) triples, as read by read_sentences(), into chunks
+    of (up to) size sentences; yield (index of the first sentence of the chunk, list of the triples)"""
+    sents = iter(sents)
+    start = 1
+    chunk = list(itertools.islice(sents, size))
+    while chunk:
+        yield start, chunk
+        start += len(chunk)
+        chunk = list(itertools.islice(sents, size))
+
+_job = None # (identifier, args, conllulex), inherited by forked workers
+
+def _identify_chunk(chunk):
+    identifier, args, conllulex = _job
+    start, sents = chunk
+    out = io.StringIO()
+    counts = [0, 0, 0, 0]
+    records = [] if args.error_index else None
+    for si, (offset, meta, lines) in enumerate(sents, start=start):
+        sent = Sentence([Token(line, conllulex=conllulex) for line in lines], meta, offset)
+        identification = identifier.identify_sentence(sent, skip_unclear=conllulex)
+        counts = [a+b for a, b in zip(counts, print_identified(sent, si, identification, args, out, records))]
+    return out.getvalue(), counts, records
+
+def identify_parallel(identifier, args, conllulex):
+    """Identify targets in chunks of sentences with args.jobs worker processes, which share the model by forking;
+    yield (output, counts, error index records) for each chunk in input order"""
+    global _job
+    _job = identifier, args, conllulex
+    if args.error_index:
+        sents = read_sentences(args.file, offsets=True)
+    else:
+        sents = ((None, meta, lines) for meta, lines in read_sentences(args.file))
+    pending = deque()
+    with multiprocessing.get_context("fork").Pool(args.jobs) as pool:
+        for chunk in sentence_chunks(sents):
+            pending.append(pool.apply_async(_identify_chunk, (chunk,)))
+            while len(pending) > 2*args.jobs: # limit the number of chunks held in memory
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+class _SweepIdentifier(Identifier):
+    """Identifier for a candidate model in a sweep, with the results of the heuristics precomputed
+    for the tokens of the dev sentences (see heuristics_table())"""
+
+    def __init__(self, model, table, mwe=True, mwe_list=None, mwe_anti_list=None, lexicon=None):
+        if lexicon is not None:
+            model = dict(model, lexicon=lexicon)
+        Identifier.__init__(self, model, mwe, mwe_list, mwe_anti_list)
+        self.table = table
+        self.advcl = frozenset(model["advcl"])
+        self.acl = frozenset(model["acl"])
+
+    def heuristics(self, token, sentence):
+        before, to, after = self.table[id(sentence)][token.index]
+        if to is None:
+            return before + after
+        matrix_lemma, results = to
+        return before + results[matrix_lemma in self.advcl, matrix_lemma in self.acl] + after
+
+def heuristics_table(sentences):
+    """For each token of the sentences, precompute the heuristics that do not depend on the model,
+    and the result of heuristicTO() depending on whether the lemma of the matrix predicate
+    is in the model's advcl and acl lists"""
+    table = {}
+    for sentence in sentences:
+        table[id(sentence)] = entries = []
+        for token in sentence.tokens:
+            before = heuristicADP(token) + heuristicPossessive(token, sentence) + heuristicSCONJ(token, None) + heuristicADV(token)
+            after = heuristicForXTo(token, sentence)
+            to = None
+            if token.ptb_pos == "TO":
+                matrix_lemma = sentence.tokens[sentence.tokens[token.head_index].head_index].lemma
+                to = matrix_lemma, {(a, c): heuristicTO(token, sentence, {"advcl": {matrix_lemma} if a else (), "acl": {matrix_lemma} if c else ()})
+                                    for a in (False, True) for c in (False, True)}
+            entries.append((before, to, after))
+    return table
+
+def pareto_frontier(results):
+    """Of (thresholds, P, R, F) results, those not dominated in both P and R by another one
+    (the first of several with the same P and R), by increasing R"""
+    frontier = []
+    best_p = None
+    for result in sorted(results, key=lambda result: (-result[2], -result[1])):
+        if best_p is None or result[1] > best_p:
+            frontier.append(result)
+            best_p = result[1]
+    return frontier[::-1]
+
+def sweep(args):
+    """Train models on the training data with all combinations of the threshold values given,
+    evaluate each on the dev file args.sweep, and print the Pareto frontier of precision and recall"""
+    counts = collect_counts(args.training_file or args.file)
+    dev = list(sentences(args.sweep, conllulex=True))
+    table = heuristics_table(dev)
+    lexicons = {} # (p_mwe_min, non_p_mwe_min) -> compiled lexicon
+    results = []
+    for thresholds in itertools.product(args.p_mwe_min, args.non_p_mwe_min, args.advcl_min, args.acl_min):
+        model = model_from_counts(counts, *thresholds)
+        lexicon = None
+        if not (args.mwe_list or args.mwe_anti_list):
+            if thresholds[:2] not in lexicons:
+                lexicons[thresholds[:2]] = build_lexicon(model)
+            lexicon = lexicons[thresholds[:2]]
+        identifier = _SweepIdentifier(model, table, args.mwe, args.mwe_list, args.mwe_anti_list, lexicon)
+        tp, fp, fn = 0, 0, 0
+        for sent in dev:
+            for outcomes in score_identified(sent, identifier.identify_sentence(sent, skip_unclear=True)):
+                tp += "tp" in outcomes
+                fp += "fp" in outcomes
+                fn += "fn" in outcomes
+        p = tp/(tp+fp) if tp+fp else 0.0
+        r = tp/(tp+fn) if tp+fn else 0.0
+        f = (2*p*r)/(p+r) if p+r else 0.0
+        results.append((thresholds, p, r, f))
+
+    print("{} models evaluated".format(len(results)), file=sys.stderr)
+    print("p_mwe_min\tnon_p_mwe_min\tadvcl_min\tacl_min\tP\tR\tF")
+    for thresholds, p, r, f in pareto_frontier(results):
+        print("\t".join(map(str, thresholds)) + "\t{}\t{}\t{}".format(p, r, f))
+
+
+def identify_gold(sentence):
+    """Return the Identification given by the gold standard annotation of a sentence in full .conllulex format
+    (lexcats are those of all tokens, None where missing)"""
+    marks = []
+    mwes = {}
+    for tok in sentence.tokens:
+        isTarget = tok.ss and tok.ss.startswith("p.")
+        isMWE = bool(tok.smwe)
+        mark = "-"
+        if isMWE:
+            mark = tok.smwe
+            if isTarget:
+                mark += "**"
+            i, j = tok.smwe.split(":")
+            if i not in mwes:
+                mwes[i] = []
+            mwes[i].append(int(tok.offset))
+
+        elif isTarget:
+            mark = "*"
+        marks.append(mark)
+
+    return Identification(marks, list(mwes.values()), [tok.lexcat for tok in sentence.tokens])
+
 def pass_trough_gold(args):
+    out = SSTWriter() if args.sst else sys.stdout
     for sent in sentences(args.file, conllulex=True):
+        marks, mwes, lexcats = identify_gold(sent)
         if not (args.sst or args.eval or args.tp or args.fp or args.fn or args.tn):
             for metaline in sent.meta:
                 print(metaline)
-        mwes = {}
-        for tok in sent.tokens:
-            isTarget = tok.ss and tok.ss.startswith("p.")
-            isMWE = bool(tok.smwe)
-            tok.checkmark = "-"
-            if isMWE:
-                tok.checkmark = tok.smwe
-                if isTarget:
-                    tok.checkmark += "**"
-                i, j = tok.smwe.split(":")
-                if i not in mwes:
-                    mwes[i] = []
-                mwes[i].append(int(tok.offset))
-
-            elif isTarget:
-                tok.checkmark = "*"
-
-
-            if not (args.sst or args.eval or args.tp or args.fp or args.fn or args.tn):
-                print("{}\t{}".format(tok.orig, tok.checkmark) + ("\t{}".format(tok.lexcat) if args.lexcat else ""))
+            for tok, mark, lexcat in zip(sent.tokens, marks, lexcats):
+                print("{}\t{}".format(tok.orig, mark) + ("\t{}".format(lexcat) if args.lexcat else ""))
 
         if args.sst:
-            _json = {}
-            _json["words"] = []
-            _json["lemmas"] = []
-            _json["tags"] = []
-            _json["labels"] = {}
-            _json["_"] = list(mwes.values())
-            _json["~"] = []
-            _sent = []
-            for tok in sent.tokens:
-                _sent.append(tok.word)
-                _json["words"].append([tok.word, tok.ptb_pos])
-                _json["lemmas"].append(tok.lemma)
-                if tok.checkmark.endswith("*"):
-                    _json["labels"][tok.offset] = [tok.word, tok.ss.split(".")[1]]
-            print("{}\t{}\t{}".format(sent.meta_dict["streusle_sent_id"], sent.meta_dict["mwe"], json.dumps(_json)))
+            out.write(sst_line(sent.meta_dict["streusle_sent_id"], sent, marks, mwes, lambda tok: tok.ss.split(".")[1],
+                               rendered=sent.meta_dict["mwe"]))
+    if args.sst:
+        out.flush()
+
 
-        
 def main(args):
     if args.gold:
         pass_trough_gold(args)
 
+    elif args.sweep:
+        sweep(args)
+
     else:
         if args.model_file:
-            model = json.load(open(args.model_file, encoding='utf-8'))
+            model = load_model(args.model_file)
+            if args.model_out:
+                save_model(model, args.model_out, compiled=args.compiled)
         elif args.training_file:
             model = train(args.training_file, args)
         else:
@@ -435,12 +787,21 @@ def main(args):
         identify(model, args)
 
         
+def threshold_values(s):
+    """Parse comma-separated integers and ranges of integers, e.g. "1,3-5" -> [1, 3, 4, 5]"""
+    values = []
+    for part in s.split(","):
+        first, _, last = part.partition("-")
+        values.extend(range(int(first), int(last or first)+1))
+    return values
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='finds markables heuristically by POS tags and annotates them with an asterisk (*), or two of them (**) for MWEs')
-    parser.add_argument('file', type=str, help='path to the .conllulex file')
-    parser.add_argument('-f', '--training-file', type=str, help='path to the training .conllulex file')
-    parser.add_argument('-M', '--model-file', type=str, help='path to the model file (read)')
-    parser.add_argument('-o', '--model-out', type=str, help='path to the model file (write)')
+    parser.add_argument('file', type=str, help='path to the .conllulex file (may be compressed with gzip, bzip2, or xz), or - for standard input')
+    parser.add_argument('-f', '--training-file', type=str, help='path to the training .conllulex file (may be compressed), or - for standard input')
+    parser.add_argument('-M', '--model-file', type=str, help='path to the model file (read), in JSON or compiled format')
+    parser.add_argument('-o', '--model-out', type=str, help='path to the model file (write); with -M, converts the model read')
+    parser.add_argument('-C', '--compiled', action='store_true', help='write the model in compiled (binary) format, which loads faster')
     parser.add_argument('-m', '--mwe', action='store_true', help='also look for mwes')
     parser.add_argument('-l', '--mwe-list', type=str, help='read lexical list of MWEs from file MWE_LIST')
     parser.add_argument('-i', '--mwe-anti-list', type=str, help='read lexical list of MWEs to EXCLUDE from file MWE_ANTI_LIST')
@@ -450,15 +811,37 @@ if __name__ == "__main__":
     parser.add_argument('-c', '--fn', action='store_true', help='false negatives')
     parser.add_argument('-d', '--tn', action='store_true', help='true negatives')
     parser.add_argument('-n', '--context', type=int, default=0, help='number of context lines to print before and after target (only has effect when used with --tp, --fp, --fn, or --tn)')
+    parser.add_argument('--error-index', type=str, metavar='FILE', help='also write the outcome of each token (true/false positive/negative) '
+                        'to the error index FILE, from which view_errors.py shows targets of any class; works ONLY with full .conllulex format')
     parser.add_argument('-s', '--sst', action='store_true', help='output .sst format instead of .conlluX format')
-    parser.add_argument('-p', '--p-mwe-min', type=int, default=3, help='threshold for prepositional MWE lexicon')
-    parser.add_argument('-P', '--non-p-mwe-min', type=int, default=1, help='threshold for non-prepositional MWE lexicon')
-    parser.add_argument('--advcl-min', type=int, default=1, help='threshold for advcl heads that take non-prepositional infinitival complements')
-    parser.add_argument('--acl-min', type=int, default=1, help='threshold for acl heads that take non-prepositional infinitival complements')
+    parser.add_argument('-p', '--p-mwe-min', type=threshold_values, default='3', help='threshold for prepositional MWE lexicon')
+    parser.add_argument('-P', '--non-p-mwe-min', type=threshold_values, default='1', help='threshold for non-prepositional MWE lexicon')
+    parser.add_argument('--advcl-min', type=threshold_values, default='1', help='threshold for advcl heads that take non-prepositional infinitival complements')
+    parser.add_argument('--acl-min', type=threshold_values, default='1', help='threshold for acl heads that take non-prepositional infinitival complements')
+    parser.add_argument('--sweep', type=str, metavar='DEV', help='train on the training data with every combination of the threshold values given '
+                        '(comma-separated values or ranges, e.g. -p 1-5 --acl-min 1,2), evaluate each model on the full .conllulex file DEV, '
+                        'and print the Pareto frontier of precision and recall')
     parser.add_argument('-L', '--lexcat', action='store_true', help='output lexical categories')
     parser.add_argument('-g', '--gold', action='store_true', help='re-use gold standard annotation')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='number of worker processes identifying chunks of sentences in parallel (output is in input order)')
 #    parser.add_argument('-v', '--verbose', action='store_true', help='')
 
     args = parser.parse_args()
-    
+    if not args.sweep:
+        for name in ('p_mwe_min', 'non_p_mwe_min', 'advcl_min', 'acl_min'):
+            values = getattr(args, name)
+            if len(values) != 1:
+                parser.error("multiple threshold values are only allowed with --sweep")
+            setattr(args, name, values[0])
+    elif args.model_file:
+        parser.error("--sweep trains models: it cannot be used with -M")
+    if args.file == "-" and not (args.gold or args.model_file or args.training_file):
+        parser.error("training on the input file requires reading it twice: use -M or -f when reading from standard input")
+    if args.error_index and (args.gold or args.sweep):
+        parser.error("--error-index cannot be used with --gold or --sweep")
+    if args.error_index and args.file == "-":
+        parser.error("--error-index records the positions of sentences in the input file: it cannot be standard input")
+    if args.file == "-" and args.training_file == "-" and not (args.gold or args.model_file):
+        parser.error("the input and training files cannot both be standard input")
+
     main(args)
@@ -0,0 +1,101 @@
+"""
+Show targets of the selected classes (true/false positives/negatives) with context, from an error index
+written by identify.py --error-index, without identifying them again. Only the sentences that contain
+such targets are read from the input file, by seeking to them.
+
+Usage:
+
+  python identify.py ../dev/streusle.ud_dev.conllulex -M MODEL_FILE -e --error-index dev.errors
+  python view_errors.py dev.errors --fp -n 3
+"""
+
+import sys
+import argparse
+
+from helpers import *
+from identify import ErrorIndexWriter, print_target
+
+CLASSES = ("tp", "fp", "fn", "tn")
+
+def read_index(filename):
+    """Read an error index (see ErrorIndexWriter). Return the path of the input file it was written for
+    and a list of (sentence ID, byte offset, marks, outcomes) tuples, one per sentence, where outcomes
+    are (token index, token offset, outcome, lexcat) tuples."""
+    sents = []
+    with open(filename, encoding="utf-8") as f:
+        header = f.readline().rstrip("\n")
+        if not header.startswith(ErrorIndexWriter.HEADER):
+            raise ValueError("not a pssid error index: " + filename)
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if fields[0] == "S":
+                sents.append((fields[1], int(fields[2]), fields[3].split(" "), []))
+            else:
+                sents[-1][3].append((int(fields[1]), fields[2], fields[3], fields[4]))
+    return header[len(ErrorIndexWriter.HEADER):], sents
+
+def sentence_at(f, offset):
+    """Read the sentence beginning at the byte offset in the binary file f,
+    splitting and stripping lines as read_sentences(offsets=True) does"""
+    f.seek(offset)
+    meta, lines = [], []
+    for line in f:
+        line = line.decode("utf-8").strip()
+        if not line:
+            break
+        (meta if line.startswith("#") else lines).append(line)
+    return Sentence([Token(line, conllulex=True) for line in lines], meta)
+
+def view(index_file, classes, context=0, lexcat=False, input_file=None, out=None):
+    """Print the targets of the given classes in the error index as identify.py prints them
+    with the corresponding options (--tp, --fp, --fn, --tn, --context, --lexcat)"""
+    recorded_input, sents = read_index(index_file)
+    with open_input(input_file or recorded_input, binary=True) as f:
+        for sent_id, offset, marks, outcomes in sents:
+            selected = [(i, lc) for i, tok_offset, outcome, lc in outcomes if outcome in classes]
+            if not selected:
+                continue
+            try:
+                sent = sentence_at(f, offset)
+                moved = sent.meta_dict.get("sent_id", sent_id) != sent_id or len(sent.tokens) != len(marks)
+            except (ValueError, NotConllulexError):
+                moved = True
+            if moved:
+                raise ValueError("sentence {} is not at its recorded position: the input file has changed "
+                                 "since the error index was written".format(sent_id))
+            for i, lc in selected:
+                print_target(sent.tokens[i], sent, marks, i, lc if lexcat else "", context, out)
+
+def list_targets(index_file, classes, out=None):
+    """Print the targets of the given classes in the error index, one per line:
+    sentence ID, token offset, class, and lexcat, separated by tabs"""
+    for sent_id, offset, marks, outcomes in read_index(index_file)[1]:
+        for i, tok_offset, outcome, lc in outcomes:
+            if outcome in classes:
+                print("{}\t{}\t{}\t{}".format(sent_id, tok_offset, outcome, lc), file=out)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='shows targets from an error index written by identify.py --error-index')
+    parser.add_argument('index', type=str, help='path to the error index')
+    parser.add_argument('-a', '--tp', action='store_true', help='true positives')
+    parser.add_argument('-b', '--fp', action='store_true', help='false positives')
+    parser.add_argument('-c', '--fn', action='store_true', help='false negatives')
+    parser.add_argument('-d', '--tn', action='store_true', help='true negatives')
+    parser.add_argument('-n', '--context', type=int, default=0, help='number of context lines to print before and after target')
+    parser.add_argument('-L', '--lexcat', action='store_true', help='output lexical categories')
+    parser.add_argument('-f', '--input-file', type=str, help='path to the .conllulex file the index was written for, if it has moved')
+    parser.add_argument('-l', '--list', action='store_true', help='only list the targets (sentence ID, token offset, class, lexcat) '
+                        'without reading the input file')
+    args = parser.parse_args()
+
+    # false positives and negatives by default
+    classes = {c for c in CLASSES if getattr(args, c)} or {"fp", "fn"}
+    try:
+        if args.list:
+            list_targets(args.index, classes)
+        else:
+            view(args.index, classes, args.context, args.lexcat, args.input_file)
+    except ValueError as e:
+        print("ERROR:", e, file=sys.stderr)
+        sys.exit(1)
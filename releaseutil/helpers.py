@@ -1,45 +1,26 @@
+import os
 import sys
 
-class Token:
-    def __init__(self, string):
-        self.fields = string.split("\t")
-        self.offset, \
-            self.word, \
-            self.lemma, \
-            self.ud_pos, \
-            self.ptb_pos, \
-            self.morph, \
-            self.head, \
-            self.deprel, \
-            self.edeps, \
-            self.misc = self.fields[:10]
-        self.orig = string
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from conllureader import TokenLine, field, parse_meta, read_sentences
+
+class Token(TokenLine):
+    __slots__ = ()
+
+    offset, word, lemma, ud_pos, ptb_pos, morph, head, deprel, edeps, misc = [field(i) for i in range(10)]
 
 class Sentence:
     def __init__(self, tokens, meta):
         self.tokens = tokens
         self.meta = meta
-        self.meta_dict = {}
-        for meta_info in meta:
-            if ' = ' not in meta_info:
-                print('Ignoring comment line:', meta_info, file=sys.stderr)
-            else:
-                k, v = meta_info.strip("# ").split(" = ")
-                self.meta_dict[k] = v
+        self._meta_dict = None
 
-def sentences(filename):
-    tokens, meta = [], []
-    with open(filename) as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                yield Sentence(tokens, meta)
-                tokens = []
-                meta = []
-            elif line.startswith("#"):
-                meta.append(line)
-            else:
-                tokens.append(Token(line))
+    @property
+    def meta_dict(self):
+        if self._meta_dict is None:
+            self._meta_dict = parse_meta(self.meta)
+        return self._meta_dict
 
-    if tokens:
-        yield Sentence(tokens, meta)
+def sentences(filename):
+    for meta, lines in read_sentences(filename):
+        yield Sentence([Token(line) for line in lines], meta)
@@ -10,17 +10,16 @@ RELUTILDIR='releaseutil'
 
 mkdir -p {train,dev,test}
 
-$RELUTILDIR/stats.sh streusle.conllulex
-
 $RELUTILDIR/split.py streusle.conllulex $RELUTILDIR/ud_train_sent_ids.txt > train/streusle.ud_train.conllulex
 
 $RELUTILDIR/split.py streusle.conllulex $RELUTILDIR/ud_dev_sent_ids.txt > dev/streusle.ud_dev.conllulex
 
 $RELUTILDIR/split.py streusle.conllulex $RELUTILDIR/ud_test_sent_ids.txt > test/streusle.ud_test.conllulex
 
-cd train
-../$RELUTILDIR/stats.sh streusle.ud_train.conllulex
+# STATS.md, MWES.txt, LEXCAT.txt, SUPERSENSES.txt for the full corpus and each split (computed concurrently)
+./corpusstats.py streusle.conllulex train/streusle.ud_train.conllulex dev/streusle.ud_dev.conllulex test/streusle.ud_test.conllulex
 
+cd train
 ../conllulex2json.py streusle.ud_train.conllulex > streusle.ud_train.json
 
 ../govobj.py streusle.ud_train.json > streusle.ud_train.govobj.json
@@ -29,8 +28,6 @@ cd train
 cd -
 
 cd dev
-../$RELUTILDIR/stats.sh streusle.ud_dev.conllulex
-
 ../conllulex2json.py streusle.ud_dev.conllulex > streusle.ud_dev.json
 
 ../govobj.py streusle.ud_dev.json > streusle.ud_dev.govobj.json
@@ -39,8 +36,6 @@ cd dev
 cd -
 
 cd test
-../$RELUTILDIR/stats.sh streusle.ud_test.conllulex
-
 ../conllulex2json.py streusle.ud_test.conllulex > streusle.ud_test.json
 
 ../govobj.py streusle.ud_test.json > streusle.ud_test.govobj.json
@@ -12,7 +12,7 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/nert-nlp/streusle",
-    py_modules=["conllulex2csv", "conllulex2UDlextag", "govobj", "lexcatter", "normalize_mwe_numbering",
+    py_modules=["conllulex2csv", "conllulex2UDlextag", "conllureader", "corpusstats", "govobj", "lexcatter", "lextags", "normalize_mwe_numbering",
                 "streusvis", "supersenses", "tquery", "UDlextag2json", "conllulex2json",
                 "csv2conllulex", "json2conllulex", "mwerender", "psseval", "streuseval", "supdate",
                 "tagging", "tupdate"],
@@ -5,8 +5,8 @@ from collections import defaultdict, Counter
 from itertools import chain
 
 from conllulex2json import load_sents
-from supersenses import coarsen_pss
-from mwerender import render, makelabelmap
+from supersenses import get_ss_mapper
+from mwerender import Renderer, analysis_key
 
 """
 For each sentence in a corpus, visualize MWE and supersense analyses
@@ -75,25 +75,21 @@ def color_label_by_type(lbl):
             'special': Colors.BLUE,
             'other': Colors.DKGRAY}[lt] + lbl + Colors.PLAINTEXT
 
-def color_rendered(words, rr, opts):
+def diff_rendered(words, rr, opts):
     """If diff is True, treats the first input as gold and shows how others differ
-    relative to that."""
+    relative to that.
+
+    Returns, for each input, a list of cells (one per token), each a list of
+    (text, style) segments. Styles: 'word'; label types 'n', 'v', 'p', 'special',
+    'other' (see label_type()); 'incorrect', 'missing', 'extra' for labels that
+    differ from the gold; 'mwe' and 'badmwe' for MWE markup that matches or
+    differs from the gold; and 'padding' for spaces that align the tokens."""
 
     buffers = list(rr)
-    result = [()]*len(rr)
     lbls = [()]*len(rr)
     seps = [()]*len(rr)
-    clbls = [()]*len(rr)
-    cseps = [()]*len(rr)
-
-    # terminal colors
-    WORDS = Colors.BACKGROUND + Colors.PLAINTEXT
-    INCORRECT = Colors.RED
-    MISSING = EXTRA = Colors.REDBG + Colors.WHITE
-    BADMWE = Colors.PINKBG + Colors.WHITE
-    PADDING = Colors.GRAYBG + Colors.WHITE
-
-    MWE = Colors.PINK
+    slbls = [()]*len(rr)    # styled labels: () or ((text, style),)
+    sseps = [()]*len(rr)    # styled separators
 
     for i,word in enumerate(words):
         # scan buffers in parallel, match the next piece and compare
@@ -102,57 +98,50 @@ def color_rendered(words, rr, opts):
 
             # the word token
             assert b.startswith(word)
-            result[j] += (word,)
             b = b[len(word):]
 
-            lbl = sep = clbl = csep = ''
+            lbl = sep = ''
+            slbl = ssep = ()
 
             # possible supersense or special label
             if b.startswith('|'):
                 lbl = re.match(r'^[^\s_~]+', b).group(0)
                 lt = label_type(lbl)
                 # do we match the gold?
-                if (lt not in opts) or j==0 or lbls[0][-1]==lbl: # result[0][-1]==lbl:  # match! or we're gold
-                    clbl = color_label_by_type(lbl)
-                elif not lbls[0][-1]: # result[0][-1].startswith('|'):
-                    clbl = EXTRA + lbl + WORDS
+                if (lt not in opts) or j==0 or lbls[0][-1]==lbl: # match! or we're gold
+                    slbl = ((lbl, lt),)
+                elif not lbls[0][-1]:
+                    slbl = ((lbl, 'extra'),)
                 else:
-                    clbl = INCORRECT + lbl + WORDS
+                    slbl = ((lbl, 'incorrect'),)
                 b = b[len(lbl):]
-            elif j>0 and lbls[0][-1]: # result[0][-1].startswith('|'):
+            elif j>0 and lbls[0][-1]:
                 lbl = ' '*len(lbls[0][-1])
                 if label_type(lbls[0][-1]) in opts:
-                    clbl = MISSING + lbl + WORDS
+                    slbl = ((lbl, 'missing'),)
                 else:
-                    clbl = PADDING + lbl + WORDS
-            result[j] += (clbl,)
+                    slbl = ((lbl, 'padding'),)
 
             if i+1<len(words):
                 # spaces and/or MWE joiner (_ or ~)
                 sep = re.match(r'^[\s_~]+', b).group(0)
                 assert sep in (' ', '_', '~', ' _', '_ ', ' ~', '~ '),sep
-                if ('mwe' not in opts) or j==0 or seps[0][-1]==sep: #result[0][-1]==sep:  # match! or we're gold
-                    csep = MWE + sep + WORDS
+                if ('mwe' not in opts) or j==0 or seps[0][-1]==sep: # match! or we're gold
+                    ssep = ((sep, 'mwe'),)
                 else:   # mismatch
-                    csep = BADMWE + sep + WORDS
-                result[j] += (csep,)
+                    ssep = ((sep, 'badmwe'),)
                 b = b[len(sep):]
             else:
                 assert not b
 
             lbls[j] += (lbl,)
             seps[j] += (sep,)
-            clbls[j] += (clbl,)
-            cseps[j] += (csep,)
+            slbls[j] += (slbl,)
+            sseps[j] += (ssep,)
             buffers[j] = b
-    # c = WORDS+s.replace('_',MWE+'_'+WORDS)+Colors.PLAINTEXT
-    # c = WORDS+c.replace('~',MWE+'~'+WORDS)+Colors.PLAINTEXT
-    # c = re.sub(r'(\|v\.\w+)', VERBS+r'\1'+WORDS, c)   # verb supersenses
-    # c = re.sub(r'(\|n\.\w+)', NOUNS+r'\1'+WORDS, c)   # noun supersenses
-    # c = re.sub(r'(\|p\.\w+(:p\.\w+)?)', SNACS+r'\1'+WORDS, c)   # SNACS supersenses (prepositions/possessives)
-
-    # assemble final strings, pad everything so tokens align
-    ss = ['']*len(rr)
+
+    # assemble cells, pad everything so tokens align
+    rows = [[] for r in rr]
     for i in range(len(words)):
         lbl_width = max(len(lbl) for lbl in list(zip(*lbls))[i])
         sep_width = max(len(sep) for sep in list(zip(*seps))[i])
@@ -163,24 +152,191 @@ def color_rendered(words, rr, opts):
             # any padding to add
             lpadding = ' '*(lbl_width - len(lbl))
             spadding = ' '*(sep_width - len(sep))
-            clbl = clbls[j][i]
-            csep = cseps[j][i]
+            cell = [(words[i], 'word')]
+            cell.extend(slbls[j][i])
             if seps[0][i].endswith(('_','~')): # pad before the separator, which attaches to next token
-                lspadding = lpadding + spadding
-                if lspadding:
-                    lspadding = PADDING + lpadding + spadding + WORDS
-                clblsep = clbl + lspadding + csep
+                if lpadding + spadding:
+                    cell.append((lpadding + spadding, 'padding'))
+                cell.extend(sseps[j][i])
             else:
-                if lpadding: lpadding = PADDING + lpadding + WORDS
-                if spadding: spadding = PADDING + spadding + WORDS
-                clblsep = clbl + lpadding + csep + spadding
-            ss[j] += words[i] + clblsep + Colors.CLREOL
+                if lpadding: cell.append((lpadding, 'padding'))
+                cell.extend(sseps[j][i])
+                if spadding: cell.append((spadding, 'padding'))
+            rows[j].append(cell)
+
+    return rows
 
-    #if 'Canyon_Road' in rr[0]:
-    #    assert False,ss
+def color_rendered(words, rr, opts):
+    """If diff is True, treats the first input as gold and shows how others differ
+    relative to that. Returns a string with terminal colors, one line per input."""
 
+    # terminal colors
+    WORDS = Colors.BACKGROUND + Colors.PLAINTEXT
+    INCORRECT = Colors.RED
+    MISSING = EXTRA = Colors.REDBG + Colors.WHITE
+    BADMWE = Colors.PINKBG + Colors.WHITE
+    PADDING = Colors.GRAYBG + Colors.WHITE
+
+    MWE = Colors.PINK
+
+    # (before, after) for each style
+    codes = {'word': ('', ''),
+             'v': (Colors.CYAN, Colors.PLAINTEXT),
+             'n': (Colors.YELLOW, Colors.PLAINTEXT),
+             'p': (Colors.GREEN, Colors.PLAINTEXT),
+             'special': (Colors.BLUE, Colors.PLAINTEXT),
+             'other': (Colors.DKGRAY, Colors.PLAINTEXT),
+             'incorrect': (INCORRECT, WORDS),
+             'missing': (MISSING, WORDS),
+             'extra': (EXTRA, WORDS),
+             'padding': (PADDING, WORDS),
+             'mwe': (MWE, WORDS),
+             'badmwe': (BADMWE, WORDS)}
+
+    ss = []
+    for row in diff_rendered(words, rr, opts):
+        ss.append(''.join(''.join(codes[style][0] + text + codes[style][1] for text,style in cell) + Colors.CLREOL
+                          for cell in row))
     return '\n'.join(ss)
 
+class HTMLReport(object):
+    """
+    Static HTML report of the sentences output by diff_rendered().
+    OUTDIR/index.html shows one page of sentences at a time. The data for each page
+    is stored in a separate file, OUTDIR/shards/N.js, that is only loaded when the
+    page is viewed, so the report opens quickly regardless of the size of the corpus.
+    (The shards are JSON wrapped in a function call rather than plain .json files
+    because browsers do not allow scripts to fetch local files.)
+    """
+    def __init__(self, outdir, filenames, shard_size=200):
+        self.outdir = outdir
+        self.filenames = filenames
+        self.shard_size = shard_size
+        self.nSents = 0
+        self.nShards = 0
+        self._shard = []
+        os.makedirs(os.path.join(outdir, 'shards'), exist_ok=True)
+
+    def add(self, sent_id, rows):
+        """Add a sentence with a list of rows, one per input file,
+        each a list of cells consisting of (text, style) segments"""
+        self._shard.append([sent_id, [[[text, style] for cell in row for text,style in cell] for row in rows]])
+        self.nSents += 1
+        if len(self._shard)==self.shard_size:
+            self._write_shard()
+
+    def _write_shard(self):
+        with open(os.path.join(self.outdir, 'shards', f'{self.nShards}.js'), 'w', encoding='utf-8') as outF:
+            outF.write(f'loadShard({self.nShards}, ')
+            json.dump(self._shard, outF, ensure_ascii=False, separators=(',',':'))
+            outF.write(');\n')
+        self.nShards += 1
+        self._shard = []
+
+    def close(self):
+        if self._shard or not self.nShards:
+            self._write_shard()
+        config = json.dumps({'nSents': self.nSents, 'nShards': self.nShards, 'shardSize': self.shard_size,
+                             'files': [os.path.basename(f) for f in self.filenames]}).replace('</', '<\\/')
+        with open(os.path.join(self.outdir, 'index.html'), 'w', encoding='utf-8') as outF:
+            outF.write(HTML_TEMPLATE.replace('{{CONFIG}}', config))
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>streusvis</title>
+<style>
+body { background: black; color: white; font-family: monospace; }
+#pager { position: sticky; top: 0; background: #222; padding: 4px; }
+table.sent { margin: 8px 0; border-collapse: collapse; }
+td { padding: 0 8px 0 0; vertical-align: top; }
+td.sentid, td.file { color: gray; }
+td.analysis { white-space: pre; }
+.v { color: cyan; }
+.n { color: gold; }
+.p { color: lime; }
+.special { color: dodgerblue; }
+.other { color: gray; }
+.mwe { color: violet; }
+.incorrect { color: red; }
+.missing, .extra { background: red; color: white; }
+.badmwe { background: violet; color: white; }
+.padding { background: gray; color: white; }
+</style>
+</head>
+<body>
+<div id="pager">
+<button onclick="go(0)">&laquo;</button>
+<button onclick="go(page-1)">&lsaquo;</button>
+page <input id="pagenum" size="5" onchange="go(parseInt(this.value)-1)"> of <span id="npages"></span>
+<button onclick="go(page+1)">&rsaquo;</button>
+<button onclick="go(config.nShards-1)">&raquo;</button>
+<span id="status"></span>
+</div>
+<div id="sents"></div>
+<script>
+var config = {{CONFIG}};
+var shards = {};
+var page = 0;
+
+function loadShard(k, sents) {
+    shards[k] = sents;
+    if (k === page) show(k);
+}
+
+function go(k) {
+    if (isNaN(k)) k = page;
+    page = Math.max(0, Math.min(k, config.nShards-1));
+    document.getElementById('pagenum').value = page+1;
+    location.hash = page+1;
+    if (page in shards) {
+        show(page);
+    } else {
+        document.getElementById('status').textContent = 'loading...';
+        var script = document.createElement('script');
+        script.src = 'shards/' + page + '.js';
+        document.head.appendChild(script);
+    }
+}
+
+function show(k) {
+    var container = document.getElementById('sents');
+    container.textContent = '';
+    shards[k].forEach(function(sent) {
+        var table = document.createElement('table');
+        table.className = 'sent';
+        sent[1].forEach(function(row, j) {
+            var tr = table.insertRow();
+            var td = tr.insertCell();
+            td.className = 'sentid';
+            td.textContent = (j === 0) ? sent[0] : '';
+            td = tr.insertCell();
+            td.className = 'file';
+            td.textContent = config.files[j];
+            td = tr.insertCell();
+            td.className = 'analysis';
+            row.forEach(function(seg) {
+                var span = document.createElement('span');
+                if (seg[1] !== 'word') span.className = seg[1];
+                span.textContent = seg[0];
+                td.appendChild(span);
+            });
+        });
+        container.appendChild(table);
+    });
+    var first = k*config.shardSize;
+    document.getElementById('status').textContent = 'sentences ' + (first+1) + '-' + (first+shards[k].length) + ' of ' + config.nSents;
+    window.scrollTo(0, 0);
+}
+
+document.getElementById('npages').textContent = config.nShards;
+go(parseInt(location.hash.substring(1))-1 || 0);
+</script>
+</body>
+</html>
+"""
+
 # def color_render(*args, **kwargs):
 #     # terminal colors
 #     WORDS = Colors.PLAINTEXT
@@ -198,6 +354,8 @@ def color_rendered(words, rr, opts):
 #
 #     return c
 
+OUTPUT_CHUNK = 2000  # max. number of output strings to buffer before writing
+
 def main(args):
     if args.colorless or not sys.stdin.isatty():
         for c in dir(Colors):
@@ -211,15 +369,13 @@ def main(args):
     goldF = args.goldfile
     sysFs = args.sysfile
 
-    ss_mapper = lambda ss: coarsen_pss(ss, args.depth) if ss.startswith('p.') else ss
+    ss_mapper = get_ss_mapper(args.depth)
 
-    # Load gold data
-    gold_sents = list(load_sents(goldF, ss_mapper=ss_mapper))
+    # Load gold and system data, streaming the files in parallel
+    gold_sents = load_sents(goldF, ss_mapper=ss_mapper)
 
     predFs = [load_sents(predFP, ss_mapper=ss_mapper) for predFP in sysFs]
 
-    all_sys_scores = {}
-
     def filter_labels(ll):
         result = dict(ll)
         for k,l in ll.items():
@@ -228,40 +384,59 @@ def main(args):
             elif l.startswith('p.') and args.no_snacs: del result[k]
         return result
 
-    R = lambda ww,sg,wg,ll: render(ww, sg if not args.no_mwe else [], wg if not args.no_mwe else [], filter_labels(ll))
+    renderer = Renderer(cache_size=10000)  # system analyses often match gold
+    R = lambda sent: renderer.render_sent(sent, lexcats=args.lexcats, supersenses=True,
+                                          mwes=not args.no_mwe, label_filter=filter_labels)
 
+    diff_classes = set()
+    if not args.no_diff:
+        diff_classes.add('special')
+        if not args.no_mwe_diff: diff_classes.add('mwe')
+        if not args.no_noun_diff: diff_classes.add('n')
+        if not args.no_snacs_diff: diff_classes.add('p')
+        if not args.no_verb_diff: diff_classes.add('v')
+
+    out = []    # output is written in chunks of OUTPUT_CHUNK strings
+    report = HTMLReport(args.html, [goldF.name] + [f.name for f in sysFs]) if args.html else None
     for i,sent in enumerate(gold_sents):
-        # gold analysis
-        words = [t["word"] for t in sent["toks"]]
-        rendered = []
-        rendered.append(R(words,
-                           [e["toknums"] for e in sent["smwes"].values()],
-                           [e["toknums"] for e in sent["wmwes"].values()],
-                           makelabelmap(sent, include_lexcat=args.lexcats, include_supersenses=True)))
+        psents = []
         for predF in predFs:
             psent = next(predF)
             assert psent['sent_id']==sent['sent_id']
-            rendered.append(R(words,
-                               [e["toknums"] for e in psent["smwes"].values()],
-                               [e["toknums"] for e in psent["wmwes"].values()],
-                               makelabelmap(sent, include_lexcat=args.lexcats, include_supersenses=True)))
-
-        diff_classes = set()
-        if not args.no_diff:
-            diff_classes.add('special')
-            if not args.no_mwe_diff: diff_classes.add('mwe')
-            if not args.no_noun_diff: diff_classes.add('n')
-            if not args.no_snacs_diff: diff_classes.add('p')
-            if not args.no_verb_diff: diff_classes.add('v')
+            psents.append(psent)
+
+        if args.only_diffs:
+            # skip the sentence if all analyses are identical to gold
+            # (compared before rendering, so differences hidden by the display options still count)
+            gold_analysis = analysis_key(sent, not args.no_mwe)
+            if all(analysis_key(psent, not args.no_mwe)==gold_analysis for psent in psents):
+                continue
+
+        # gold analysis
+        words = [t["word"] for t in sent["toks"]]
+        rendered = [R(sent)] + [R(psent) for psent in psents]
+
+        if report:
+            report.add(sent['sent_id'], diff_rendered(words, rendered, diff_classes))
+            continue
 
         if args.sent_ids:
-            print(sent['sent_id'], end='\t')
-        print(color_rendered(words, rendered, diff_classes))
+            out.append(sent['sent_id'] + '\t')
+        out.append(color_rendered(words, rendered, diff_classes) + '\n')
         #assert False,(color_rendered(words, rendered),words,rendered)
 
-    # restore the terminal's default colors
-    print(Colors.ENDC, end='')
+        if len(out)>=OUTPUT_CHUNK:
+            sys.stdout.write(''.join(out))
+            out = []
 
+    if report:
+        report.close()
+        print(f'Wrote {report.nSents} sentences to {report.outdir}/index.html', file=sys.stderr)
+        return
+
+    # restore the terminal's default colors
+    out.append(Colors.ENDC)
+    sys.stdout.write(''.join(out))
 
 if __name__=='__main__':
     parser = argparse.ArgumentParser(description='For each sentence in a corpus, visualize MWE and supersense analyses'
@@ -278,6 +453,10 @@ if __name__=='__main__':
                         help='include sentence IDs as a first column')
     parser.add_argument('-l', '--lexcats', action='store_true',
                         help='include lexcats')
+    parser.add_argument('-o', '--only-diffs', action='store_true',
+                        help='only show sentences where some system analysis differs from the first file')
+    parser.add_argument('--html', metavar='OUTDIR',
+                        help='instead of terminal output, write a paginated HTML report to OUTDIR/index.html')
 
     diffopts = parser.add_argument_group('diff options')
     diffopts.add_argument('-d', '--no-diff', action='store_true',
@@ -11,6 +11,18 @@ Usage:
 
   ./supdate.py streusle.conllulex updates.tsv > streusle.new.json
 
+Options:
+
+  --render-cache PATH: file storing a digest of the rendering of each corpus
+  sentence that has been compared with updates.tsv. If it was computed for the
+  current version of the corpus, unchanged sentences in updates.tsv are detected
+  by comparing digests, without rerendering them. Digests of the sentences
+  rendered in this run are added to it (or it is started afresh if the corpus
+  has changed), so no sentence is rendered more often than without a cache.
+
+  -j N, --jobs N: number of worker processes for reanalyzing changed sentences
+  (default: 1, i.e. no worker processes)
+
 updates.tsv must contain 2 tab-separated columns: sentence IDs and rendered sentences.
 The rendered sentence may be split across multiple consecutive lines,
 with the sentence ID specified only in the first of these.
@@ -26,15 +38,16 @@ their tokenization or syntactic parse.
 @since: 2019-09-16
 """
 
-import sys, re
+import sys, re, hashlib
+from argparse import ArgumentParser
+from collections import deque
+from multiprocessing import Pool
 
 from conllulex2json import load_sents, print_json
 from conllulex2UDlextag import simplify_to_UDlextag
 from UDlextag2json import load_sents as load_UDlextag_sents
 from mwerender import render, render_sent, unrender
 
-conllulexFP, updatesFP = sys.argv[1:]
-
 """
 ALGORITHM OVERVIEW
 
@@ -49,86 +62,189 @@ d) Convert the modified UDlextag to JSON.
 e) Re-render the sentence to make sure it matches what the user specified.
 """
 
-"""
-1. Load streusvis.py-created file with potential updates to be made.
-It must contain 2 tab-separated columns: sentence IDs and rendered sentences.
-The rendered sentence may be split across multiple consecutive lines,
-with the sentence ID specified only in the first of these.
-"""
-updates = {}
-with open(updatesFP, encoding='utf-8') as updatesF:
-    sentid = None
-    for ln in updatesF:
-        if not ln.strip():
-            sentid = None
-            continue
-        ln = ln.rstrip()
-        s, r = ln.split('\t')
-        if s:
-            sentid = s
-            assert sentid not in updates
-            updates[sentid] = r
-        else:   # continuation of second column from previous line
-            assert sentid
-            updates[sentid] += ' ' + r
-
-"""
-2. Scan the full corpus .conllulex for sentences with their original annotations.
-If there was a change, parse the rendered lexical semantic analysis into tags,
-substitute the tags in the UDlextag format, and parse the sentence to JSON in
-order to update the fields: 'mwe', 'toks', 'swes', 'smwes', 'wmwes'
-('etoks' etc. will be unaffected).
-"""
-sents = []
-with open(conllulexFP, encoding='utf-8') as conllulexF:
+UPDATED_FIELDS = ('mwe', 'toks', 'swes', 'smwes', 'wmwes')
+
+MAX_PENDING = 1000  # max. number of sentences held back while waiting for workers, to keep output streaming
+
+def load_updates(updatesFP):
+    """
+    1. Load streusvis.py-created file with potential updates to be made.
+    It must contain 2 tab-separated columns: sentence IDs and rendered sentences.
+    The rendered sentence may be split across multiple consecutive lines,
+    with the sentence ID specified only in the first of these.
+    """
+    updates = {}
+    with open(updatesFP, encoding='utf-8') as updatesF:
+        sentid = None
+        for ln in updatesF:
+            if not ln.strip():
+                sentid = None
+                continue
+            ln = ln.rstrip()
+            s, r = ln.split('\t')
+            if s:
+                sentid = s
+                assert sentid not in updates
+                updates[sentid] = r
+            else:   # continuation of second column from previous line
+                assert sentid
+                updates[sentid] += ' ' + r
+    return updates
+
+def digest(s):
+    return hashlib.sha1(s.encode('utf-8')).hexdigest()
+
+def corpus_digest(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as inF:
+        for block in iter(lambda: inF.read(1<<20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def load_render_cache(cacheFP, corpusDigest):
+    """Return a dict mapping sentence IDs to digests of their renderings,
+    or an empty dict if the cache is missing or was computed for a different version of the corpus."""
+    try:
+        with open(cacheFP, encoding='utf-8') as cacheF:
+            if cacheF.readline().rstrip('\n')!=f'# {corpusDigest}':
+                return {}
+            return dict(ln.rstrip('\n').split('\t') for ln in cacheF)
+    except FileNotFoundError:
+        return {}
+
+def save_render_cache(cacheFP, corpusDigest, renderDigests):
+    with open(cacheFP, 'w', encoding='utf-8') as cacheF:
+        print(f'# {corpusDigest}', file=cacheF)
+        for sentid, d in renderDigests.items():
+            print(sentid, d, sep='\t', file=cacheF)
+
+def reanalyze(sentid, toks, conllulex, rendered_new):
+    """
+    Parse the rendered string with the new analysis of a sentence (with words `toks`
+    and original annotations `conllulex`), and return the new values of the UPDATED_FIELDS.
+    Runs in a worker process if there are several jobs.
+    """
+    # parse the new rendered string
+    tagging = unrender(rendered_new, toks)  # this should fail if tokens have changed
+    toks2, bios, lbls = zip(*tagging)
+    assert toks==list(toks2),(toks,toks2)  # be super-duper sure tokens haven't changed
+    labeled_bio = [bio+('-'+lbl.replace(':','|') if lbl else '') for bio,lbl in zip(bios,lbls)]
+
+    # substitute new tagging in UDlextag format
+    conllulex = conllulex.strip().split('\n')
+    udlextag = simplify_to_UDlextag(conllulex)
+    assert udlextag.count('\n')==len(toks),(udlextag.count('\n'),len(toks),udlextag)
+    lines = udlextag.split('\n')
+    for i in range(len(labeled_bio)):
+        ln = lines[i]
+        newtag = labeled_bio[i]
+        lines[i] = ln[:ln.rindex('\t')] + '\t' + newtag
+
+    # add sentence ID
+    lines.insert(0, f'# sent_id = {sentid}')
+
+    # parse the new CoNLL-U-Lex
+    try:
+        newsent = next(load_UDlextag_sents(lines))
+    except AssertionError:
+        print('\n'.join(lines), file=sys.stderr)
+        raise
+
+    # re-render the sentence as a sanity check
+    rendered2 = render_sent(newsent, lexcats=True, supersenses=True)
+    assert rendered2==rendered_new
+
+    # plain dicts (not defaultdicts) so the result can be sent between processes
+    return {fld: dict(newsent[fld]) if isinstance(newsent[fld], dict) else newsent[fld] for fld in UPDATED_FIELDS}
+
+def _reanalyze(args):
+    return reanalyze(*args)
+
+def supdate(conllulexFP, updates, cacheFP=None, jobs=1, stats=None):
+    """
+    2. Scan the full corpus .conllulex for sentences with their original annotations.
+    If there was a change, parse the rendered lexical semantic analysis into tags,
+    substitute the tags in the UDlextag format, and parse the sentence to JSON in
+    order to update the fields: 'mwe', 'toks', 'swes', 'smwes', 'wmwes'
+    ('etoks' etc. will be unaffected).
+
+    Sentences are yielded in corpus order as soon as they are ready.
+    Changed sentences are reanalyzed by `jobs` worker processes.
+    If `stats` is a dict, the number of updated sentences is stored under 'nUpdatedSents'.
+    """
+    cache, corpusDigest = {}, None
+    if cacheFP:
+        corpusDigest = corpus_digest(conllulexFP)
+        cache = load_render_cache(cacheFP, corpusDigest)
+    nCached = len(cache)
+
+    pool = Pool(jobs) if jobs>1 else None
+    pending = deque()   # (sentence, new field values or async result or None)
     nUpdatedSents = 0
-    for sent in load_sents(conllulexF, store_conllulex='toks'):
-        sentid = sent['sent_id']
-        if sentid in updates:
-            # compare rendered strings to see whether there has been a change
-            rendered_old = render_sent(sent, lexcats=True, supersenses=True)
-            rendered_new = updates[sentid]
-            if rendered_old!=rendered_new:  # there has been a change
-                # parse the new rendered string
-                toks = [tok['word'] for tok in sent['toks']]
-                tagging = unrender(rendered_new, toks)  # this should fail if tokens have changed
-                toks2, bios, lbls = zip(*tagging)
-                assert toks==list(toks2),(toks,toks2)  # be super-duper sure tokens haven't changed
-                labeled_bio = [bio+('-'+lbl.replace(':','|') if lbl else '') for bio,lbl in zip(bios,lbls)]
-
-                # substitute new tagging in UDlextag format
-                conllulex = sent['conllulex'].strip().split('\n')
-                udlextag = simplify_to_UDlextag(conllulex)
-                assert udlextag.count('\n')==len(toks),(udlextag.count('\n'),len(toks),udlextag)
-                lines = udlextag.split('\n')
-                for i in range(len(labeled_bio)):
-                    ln = lines[i]
-                    newtag = labeled_bio[i]
-                    lines[i] = ln[:ln.rindex('\t')] + '\t' + newtag
-
-                # add sentence ID
-                lines.insert(0, f'# sent_id = {sentid}')
-
-                # parse the new CoNLL-U-Lex
-                try:
-                    newsent = next(load_UDlextag_sents(lines))
-                except AssertionError:
-                    print('\n'.join(lines), file=sys.stderr)
-                    raise
-
-                # update fields
-                for fld in ('mwe', 'toks', 'swes', 'smwes', 'wmwes'):
-                    sent[fld] = newsent[fld]
-
-                # re-render the sentence as a sanity check
-                rendered2 = render_sent(sent, lexcats=True, supersenses=True)
-                assert rendered2==rendered_new
-
-                nUpdatedSents += 1
-        del sent['conllulex']
-        sents.append(sent)
-
-# output the modified corpus
-print_json(sents)
 
-print(f'Reviewed inputs for {len(updates)} sentences and implemented updates to {nUpdatedSents} of them', file=sys.stderr)
+    def finish(sent, result):
+        if result is not None:
+            if pool:
+                result = result.get()
+            sent.update(result)
+        del sent['conllulex']
+        return sent
+
+    try:
+        with open(conllulexFP, encoding='utf-8') as conllulexF:
+            for sent in load_sents(conllulexF, store_conllulex='toks'):
+                sentid = sent['sent_id']
+                result = None
+
+                if sentid in updates:
+                    # compare rendered strings (or their digests, if cached) to see whether there has been a change
+                    rendered_new = updates[sentid]
+                    renderDigest = cache.get(sentid)
+                    if renderDigest is not None:
+                        changed = (renderDigest!=digest(rendered_new))
+                    else:
+                        rendered_old = render_sent(sent, lexcats=True, supersenses=True)
+                        changed = (rendered_old!=rendered_new)
+                        if cacheFP:
+                            cache[sentid] = digest(rendered_old)
+                    if changed:  # there has been a change
+                        job = (sentid, [tok['word'] for tok in sent['toks']], sent['conllulex'], rendered_new)
+                        result = pool.apply_async(_reanalyze, (job,)) if pool else reanalyze(*job)
+                        nUpdatedSents += 1
+
+                pending.append((sent, result))
+                # emit sentences whose processing is complete
+                while pending and (len(pending)>MAX_PENDING or not pool or pending[0][1] is None or pending[0][1].ready()):
+                    yield finish(*pending.popleft())
+
+            while pending:
+                yield finish(*pending.popleft())
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    if len(cache)>nCached:
+        save_render_cache(cacheFP, corpusDigest, cache)
+
+    if stats is not None:
+        stats['nUpdatedSents'] = nUpdatedSents
+
+if __name__=='__main__':
+    argparser = ArgumentParser(description='Incorporate edits to annotations in the inline rendered format '
+                                           '(output by streusvis.py) and produce the modified corpus as JSON.')
+    argparser.add_argument('conllulexFP', help='the corpus (.conllulex)')
+    argparser.add_argument('updatesFP', help='sentence IDs and edited rendered sentences (.tsv)')
+    argparser.add_argument('--render-cache', metavar='PATH', dest='cacheFP',
+                           help='file with digests of the rendered corpus sentences (used if current, and extended)')
+    argparser.add_argument('-j', '--jobs', type=int, default=1,
+                           help='number of worker processes for reanalyzing changed sentences')
+    args = argparser.parse_args()
+
+    updates = load_updates(args.updatesFP)
+
+    # output the modified corpus
+    stats = {}
+    print_json(supdate(args.conllulexFP, updates, cacheFP=args.cacheFP, jobs=args.jobs, stats=stats))
+
+    print(f'Reviewed inputs for {len(updates)} sentences and implemented updates to {stats["nUpdatedSents"]} of them', file=sys.stderr)
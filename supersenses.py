@@ -119,17 +119,74 @@ PSS_REMOVED = {'1DTrajectory', '2DArea', '3DMedium',
 #  - old Causer was renamed to Force, but Causer remains in the hierarchy with a new meaning
 #  - added: Content (but not for English)
 
+# Precomputed lookup tables
+
+MAX_PSS_DEPTH = max(PSS_DEPTH.values())
+
+PSS_ANCESTORS = {}  # SNACS label -> tuple of ancestors, from parent to root
+for ss in PSS:
+    anc = []
+    par = PSS_PARENTS[ss]
+    while par is not None:
+        anc.append(par)
+        par = PSS_PARENTS[par]
+    PSS_ANCESTORS[ss] = tuple(anc)
+del ss, anc, par
+
+# depth -> SNACS label -> label coarsened to that depth
+PSS_COARSENED = {depth: {ss: (PSS_ANCESTORS[ss][PSS_DEPTH[ss]-depth-1] if PSS_DEPTH[ss]>depth else ss) for ss in PSS}
+                 for depth in range(1, MAX_PSS_DEPTH+1)}
+
+# integer IDs for all supersense labels (noun, verb, SNACS, special)
+SS_LIST = tuple(sorted(ALL_SS))
+SS_IDS = {ss: i for i,ss in enumerate(SS_LIST)}
+
 def coarsen_pss(ss, depth):
-    coarse = ss
-    while PSS_DEPTH[coarse]>depth:
-        coarse = PSS_PARENTS[coarse]
-    return coarse
+    return PSS_COARSENED[min(depth, MAX_PSS_DEPTH)][ss]
 
 def ancestors(ss):
-    par = PSS_PARENTS[ss]
-    if par is None:
-        return []
-    return [par] + ancestors(par)
+    return PSS_ANCESTORS[ss]
+
+def ss_id(ss):
+    return SS_IDS[ss]
+
+def ss_from_id(i):
+    return SS_LIST[i]
+
+class SSMapper(dict):
+    """
+    Dict from supersense labels to their replacements, which can be called
+    as a function (e.g., as the ss_mapper argument of load_sents()).
+    Labels other than SNACS labels that are not in the dict map to themselves.
+    """
+    def __missing__(self, ss):
+        if ss.startswith('p.'):
+            raise KeyError(ss)
+        return ss
+
+    __call__ = dict.__getitem__
+
+_ss_mappers = {}
+
+def get_ss_mapper(depth):
+    """
+    Mapper that coarsens SNACS labels to the given depth of the hierarchy
+    and leaves other supersense labels unchanged.
+
+    >>> m = get_ss_mapper(2)
+    >>> m('p.Goal'), m('p.Approximator'), m('p.Circumstance'), m('n.FOOD'), m('v.stative')
+    ('p.Locus', 'p.Characteristic', 'p.Circumstance', 'n.FOOD', 'v.stative')
+    >>> m is get_ss_mapper(2)
+    True
+    >>> all(get_ss_mapper(d)(ss)==coarsen_pss(ss, d) for d in range(1,5) for ss in PSS)
+    True
+    """
+    mapper = _ss_mappers.get(depth)
+    if mapper is None:
+        mapper = SSMapper({ss: ss for ss in ALL_SS})
+        mapper.update(PSS_COARSENED[min(depth, MAX_PSS_DEPTH)])
+        _ss_mappers[depth] = mapper
+    return mapper
 
 def makesslabel(lexe):
     """Serialize all of a strong lexical expression's supersenses in a string for the full lextag"""
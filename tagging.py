@@ -5,8 +5,122 @@ import os, sys
 
 I_BAR, I_TILDE, i_BAR, i_TILDE = 'I_', 'I~', 'i_', 'i~'
 
-def sent_tags(nWords, anno, smwes, wmwes):
-    """Convert a sentence's MWE analysis to a BIO-style tag sequence."""
+# simplifications made when an analysis cannot be represented in the tagging scheme
+GAP_IN_GAP = 'removing gappy group that is wholly contained within another gap'
+WEAK_INTERLEAVES = 'removing weak group that interleaves with a strong gap'
+
+def _simplify(report, message, g, anno):
+    """Record a simplification in the report (a list), or if there is no report, print a warning"""
+    if report is None:
+        print(f'Simplifying: {message}:', g, anno, file=sys.stderr)
+    else:
+        report.append((message, g, anno))
+
+def sent_tags(nWords, anno, smwes, wmwes, report=None):
+    """
+    Convert a sentence's MWE analysis to a BIO-style tag sequence.
+
+    Token offsets in the strong and weak groups are 1-based. `anno` is only
+    used to identify the sentence in warnings. Groups that cannot be represented
+    are removed: each such simplification is appended to `report` as a
+    (message, group, anno) tuple if `report` is a list, otherwise printed.
+
+    >>> sent_tags(6, 'a b_ c~d _e f', [[2,5]], [[3,4]])
+    ['O', 'B', 'b', 'i~', 'I_', 'O']
+    >>> report = []
+    >>> sent_tags(6, 'a_ b_ c _d _e f', [[1,5],[2,4]], [], report)
+    ['B', 'o', 'o', 'o', 'I_', 'O']
+    >>> report
+    [('removing gappy group that is wholly contained within another gap', [2, 4], 'a_ b_ c _d _e f')]
+    """
+    if not smwes and not wmwes:
+        return ['O']*nWords
+
+    parents = {}        # offset -> (offset of the previous token in the same MWE, strength of the link)
+    gapstrength = {}    # offset -> kind of gap ('_' or '~'), if the offset lies within a gap
+
+    # process strong groups
+    for grp in smwes:
+        g = sorted(grp)
+        if any(j>i+1 and i in gapstrength for i,j in zip(g[:-1],g[1:])):    # gap within a gap
+            _simplify(report, GAP_IN_GAP, g, anno)
+            continue
+
+        for i,j in zip(g[:-1],g[1:]):
+            assert j not in parents
+            parents[j] = i, '_'
+            if j>i+1:
+                gapstrength.update(dict.fromkeys(range(i+1,j), '_'))
+
+    # process weak groups, skipping any that interleave with (are only partially contained in a gap of)
+    # a strong group
+    for grp in wmwes:
+        g = sorted(grp)
+        if gapstrength and any(i in gapstrength for i in g) and any(j for j in g if j not in gapstrength):
+            _simplify(report, WEAK_INTERLEAVES, g, anno)
+            continue
+        if any(j>i+1 and i in gapstrength for i,j in zip(g[:-1],g[1:])):    # gap within a gap
+            _simplify(report, GAP_IN_GAP, g, anno)
+            continue
+
+        for i,j in zip(g[:-1],g[1:]):
+            if j not in parents:
+                parents[j] = i, '~'
+            else:
+                assert parents[j][0]==i,(j,parents[j],i,g,anno)
+            if j>i+1:
+                for h in range(i+1,j):
+                    gapstrength.setdefault(h,'~')
+
+    # start with all tokens outside of MWEs and gaps, then fill in the rest
+    tagging = ['O']*nWords
+    for h in gapstrength:
+        if 0<h<=nWords:
+            tagging[h-1] = 'o'
+    for j,(i,strength) in parents.items():
+        if i and i not in parents and 0<i<=nWords:  # first token of an MWE
+            tagging[i-1] = 'b' if i in gapstrength else 'B'
+        if i and 0<j<=nWords:
+            if strength=='_': # do not attach label to strong MWE continuations
+                tagging[j-1] = i_BAR if j in gapstrength else I_BAR
+            else:
+                tagging[j-1] = i_TILDE if j in gapstrength else I_TILDE
+
+    return tagging
+
+def sent_tags_batch(sents, report=None):
+    """
+    Convert the MWE analyses of many sentences, given as
+    (nWords, anno, smwes, wmwes) tuples, to BIO-style tag sequences.
+    See sent_tags() regarding `report`.
+    """
+    return [sent_tags(nWords, anno, smwes, wmwes, report) for nWords, anno, smwes, wmwes in sents]
+
+def summarize_report(report, verbose=False, file=sys.stderr):
+    """
+    Print the number of simplifications of each kind in a report,
+    and with `verbose`, the group and sentence of each simplification.
+
+    >>> report = []
+    >>> sent_tags_batch([(3, 'a_ b _c', [[1,3]], [[1,2]]), (5, 'a_ b_ c _d _e', [[1,5],[2,4]], [])], report)
+    [['B', 'o', 'I_'], ['B', 'o', 'o', 'o', 'I_']]
+    >>> summarize_report(report, verbose=True, file=sys.stdout)
+    Simplifying (1x): removing weak group that interleaves with a strong gap
+      [1, 2] a_ b _c
+    Simplifying (1x): removing gappy group that is wholly contained within another gap
+      [2, 4] a_ b_ c _d _e
+    """
+    groups = {}
+    for message, g, anno in report:
+        groups.setdefault(message, []).append((g, anno))
+    for message, simplifications in groups.items():
+        print(f'Simplifying ({len(simplifications)}x): {message}', file=file)
+        if verbose:
+            for g, anno in simplifications:
+                print(' ', g, anno, file=file)
+
+def _sent_tags_reference(nWords, anno, smwes, wmwes, report=None):
+    """Original dict-based implementation of sent_tags(), for comparison."""
 
     tagging = []
 
@@ -21,7 +135,7 @@ def sent_tags(nWords, anno, smwes, wmwes):
         for i,j in zip(g[:-1],g[1:]):
             if j>i+1:
                 if i in gapstrength:    # gap within a gap
-                    print('Simplifying: removing gappy group that is wholly contained within another gap:', g, anno, file=sys.stderr)
+                    _simplify(report, GAP_IN_GAP, g, anno)
                     skip = True
                     break
         if skip: continue
@@ -40,14 +154,14 @@ def sent_tags(nWords, anno, smwes, wmwes):
         skip = False
         for i in g:
             if i in gapstrength and any(j for j in g if j not in gapstrength):
-                print('Simplifying: removing weak group that interleaves with a strong gap:', g, anno, file=sys.stderr)
+                _simplify(report, WEAK_INTERLEAVES, g, anno)
                 skip = True
                 break
         if skip: continue
         for i,j in zip(g[:-1],g[1:]):
             if j>i+1:
                 if i in gapstrength:    # gap within a gap
-                    print('Simplifying: removing gappy group that is wholly contained within another gap:', g, anno, file=sys.stderr)
+                    _simplify(report, GAP_IN_GAP, g, anno)
                     skip = True
                     break
         if skip: continue
@@ -80,3 +194,51 @@ def sent_tags(nWords, anno, smwes, wmwes):
         tagging.append(tag)
 
     return tagging
+
+def _random_groupings(rand, n):
+    """Generate n random (nWords, anno, smwes, wmwes) inputs, with gaps, nested gaps,
+    and weak groups that may or may not be consistent with the strong groups."""
+    for k in range(n):
+        nWords = rand.randint(1, 10)
+        free = list(range(1, nWords+1))
+        rand.shuffle(free)
+        smwes = []
+        while len(free)>=2 and rand.random()<0.7:
+            size = rand.randint(2, min(4, len(free)))
+            smwes.append(sorted(free[:size]))
+            del free[:size]
+        wmwes = []
+        units = smwes + [[i] for i in free]
+        rand.shuffle(units)
+        while len(units)>=2 and rand.random()<0.5:
+            size = rand.randint(2, min(3, len(units)))
+            wmwes.append(sorted(i for u in units[:size] for i in u))
+            del units[:size]
+        if rand.random()<0.1 and nWords>=2:    # arbitrary weak group, possibly conflicting with a strong group
+            wmwes.append(sorted(rand.sample(range(1, nWords+1), 2)))
+        yield nWords, f'sent{k}', smwes, wmwes
+
+def test_sent_tags_random():
+    """
+    The current implementation should match the original one,
+    including simplifications and assertion failures.
+
+    >>> import random
+    >>> def outcome(f, args):
+    ...     report = []
+    ...     try:
+    ...         return f(*args, report), report
+    ...     except AssertionError:
+    ...         return 'AssertionError', report
+    >>> inputs = list(_random_groupings(random.Random(0), 20000))
+    >>> [args for args in inputs if outcome(sent_tags, args)!=outcome(_sent_tags_reference, args)]
+    []
+    >>> outcomes = [outcome(sent_tags, args) for args in inputs]
+    >>> sum(1 for tags,report in outcomes if report)>1000, sum(1 for tags,report in outcomes if tags=='AssertionError')>100
+    (True, True)
+    """
+    pass
+
+if __name__=='__main__':
+    import doctest
+    doctest.testmod()
@@ -15,6 +15,7 @@ reviews-371300-0005     8-9     p.Manner        p.Manner        I was told to ta
 reviews-048363-0016     7,9     p.Manner        p.Manner        Here I am now driving confidently >> on << my >> own << .
 
 Interface: ./tquery [OPTIONS] streusle.json [+]<fldname>[<op><pattern>] [[+]<fldname2>[<op2><pattern2>] ...]
+       ./tquery [OPTIONS] -B queries.txt streusle.json
 
 OPTIONS:
 -H: omit header lines giving commit hash and call info, and column headers (these lines start with "#")
@@ -23,6 +24,21 @@ OPTIONS:
     where i and j are positive integers (j is optional)
 -S: omit sentence IDs in output
 -T: omit token numbers (offsets within the sentence) in output
+-C: omit the token in context in output (saves the work of formatting it)
+--count-only: only print the number of matches (no rows are formatted)
+--group-by fld[,fld...]: instead of printing matches, print a frequency table:
+    the number of matches for each combination of values of the given fields,
+    from most to least frequent (fields are named as in queries, e.g. ll,g.upos)
+--examples K: with --group-by, add a column listing up to K sentence IDs per row
+-B queries.txt: batch mode. Instead of a query on the command line, read one query per line
+    from queries.txt and evaluate all of them in a single pass over the corpus.
+    Each line consists of an output file path followed by the query terms
+    (shell quoting applies; blank lines and lines starting with "#" are ignored), e.g.
+
+      ptoks.tsv lc==PP? +ll +r +f
+      locus.tsv lc==P +ss=Locus
+
+    Each query's results are written to its own output file.
 
 fldname: one of the column names: w(ord), l(emma), upos, xpos, feats, head, deprel, edeps, misc, smwe, wmwe, lt (lextag)
 or lc (lexcat), ll (lexlemma), ss = r (role), f (function)
@@ -55,6 +71,7 @@ syntactic configuration (default, predicative, or stranded), and lemmas and POSe
 
 import sys, json, fileinput, re
 import shlex, subprocess
+from collections import Counter, defaultdict
 from itertools import chain
 
 TKN_LEVEL_FIELDS = {'w': 'word', 'word': 'word', 'l': 'lemma', 'lemma': 'lemma',
@@ -67,94 +84,287 @@ GOVOBJ_FIELDS = {'g': 'govlemma', 'govlemma': 'govlemma', 'o': 'objlemma', 'objl
 ALL_FIELDS = dict(**TKN_LEVEL_FIELDS, **LEX_LEVEL_FIELDS, **GOVOBJ_FIELDS)
 RE_FLAGS = re.IGNORECASE   # case-insensitive by default
 
-def tselect(jsonPath, fields, tknconstraints=[], lexconstraints=[], govobjconstraints=[], minlen=0, maxlen=float('inf')):
+_MATCHERS = {}  # (op, pattern, flags) -> compiled match function, shared across queries
+
+def compile_constraint(op, pattern, flags=None):
+    """Build a function that tests a field value against `pattern` under operator
+    `op` (one of '=', '==', '!=', '!=='). Identical constraints yield the identical
+    function object, so results can be shared between queries (see tselect_batch())."""
+    if flags is None:
+        flags = RE_FLAGS
+    k = (op, pattern, flags)
+    if k not in _MATCHERS:
+        if op=='!=':
+            r = re.compile(pattern, flags)
+            matchX = lambda s: s is None or r.search(s) is None
+        elif op=='!==':
+            r = re.compile('^' + pattern + '$', flags)
+            matchX = lambda s: s is None or r.search(s) is None
+        elif op=='==':
+            r = re.compile('^' + pattern + '$', flags)
+            matchX = lambda s: s is not None and r.search(s) is not None
+        else:
+            assert op=='=',op
+            r = re.compile(pattern, flags)
+            matchX = lambda s: s is not None and r.search(s) is not None
+        _MATCHERS[k] = matchX
+    return _MATCHERS[k]
+
+def parse_query(terms, flags=None):
+    """
+    Parse the terms of a query, e.g. ['lc==PP?', '+ll', '+o=.'], into the fields to print
+    and the constraints on token-level, lexical-level, and governor/object fields.
+    Returns (prints, tknconstraints, lexconstraints, govobjconstraints),
+    where `prints` lists only the fields requested with '+'.
+    """
+    tknconstraints, lexconstraints, govobjconstraints = [], [], []
+    prints = [] # fields whose values are to be printed
+
+    def resolve(fld):
+        if '.' in fld:
+            prefix, fld = fld.split('.',1)
+            prefix += '.'   # g. (governor) or o. (object)
+        else:
+            prefix = ''
+        return prefix + ALL_FIELDS[fld]
+
+    def add(fld, matchX):
+        if fld in TKN_LEVEL_FIELDS:
+            tknconstraints.append((fld, matchX))
+        elif fld in LEX_LEVEL_FIELDS:
+            lexconstraints.append((fld, matchX))
+        else:
+            govobjconstraints.append((fld, matchX))
+
+    for arg in terms:
+        printme = False
+        if arg.startswith('+'):
+            printme = True
+            arg = arg[1:]
+
+        if '=' in arg:
+            fld, pattern = arg.split('=', 1)
+
+            if fld.endswith('!'):
+                op = '!='
+                fld = fld[:-1]
+                if pattern.startswith('='):
+                    op += '='
+                    pattern = pattern[1:]
+            elif pattern.startswith('='):
+                op = '=='
+                pattern = pattern[1:]
+            else:
+                op = '='
 
+            fld = resolve(fld)
+            add(fld, compile_constraint(op, pattern, flags))
+        else:
+            assert printme
+            fld = arg
+
+        if printme:
+            fld = resolve(fld)
+            if fld not in prints:
+                prints.append(fld)
+            # to the "constraints", add a dummy item indicate that the field should be looked up for printing
+            add(fld, None)
+
+    return prints, tknconstraints, lexconstraints, govobjconstraints
+
+def _check(cache, fld, matchX, v):
+    """Apply a constraint to a value, consulting/filling the per-expression cache if there is one."""
+    if cache is None:
+        return matchX(v)
+    k = (fld, matchX)
+    if k not in cache:
+        cache[k] = matchX(v)
+    return cache[k]
+
+def tokoffset(toknums):
+    """Token offset(s) of a lexical expression as displayed in the output,
+    e.g. '3', '8-9' (contiguous), or '7,9' (gappy)"""
+    if 1 < len(toknums) == max(toknums)-min(toknums)+1:
+        return f'{min(toknums)}-{max(toknums)}'
+    return ','.join(map(str,toknums))
+
+def _context(sent, toknums, sentcache):
+    """The sentence with the tokens of the lexical expression highlighted in >> ... <<.
+    The sentence's words are looked up once and stored in `sentcache`."""
+    words = sentcache.get('words')
+    if words is None:
+        words = sentcache['words'] = [tok["word"] for tok in sent["toks"]]
+    pieces = []
+    j = 0   # index of the first word not yet added
+    for i in sorted(toknums):
+        if pieces and i-1==j:   # continues the current run of matched tokens
+            pieces.pop()    # '<<'
+        else:
+            pieces.extend(words[j:i-1])
+            pieces.append('>>')
+        pieces.append(words[i-1])
+        pieces.append('<<')
+        j = i
+    pieces.extend(words[j:])
+    return ' '.join(pieces) + ' '
+
+def _select_lexe(sent, lexe, fields, tknconstraints, lexconstraints, govobjconstraints, cache=None, sentcache=None):
+    """Return the dict of values to print if the lexical expression satisfies the constraints,
+    else None. `cache` optionally memoizes constraint results for this expression across queries;
+    `sentcache` stores information computed once per sentence."""
+    myprints = {k: None for k in fields}
+    # at the lexical expression level: lexcat, lexlemma, ss (role), ss2 (function), heuristic_relation["govlemma", "objlemma", "config"]
+    for fld, matchX in lexconstraints:
+        if matchX and not _check(cache, fld, matchX, lexe[fld]):
+            return None
+        if matchX is None:
+            myprints[fld] = lexe[fld]
+    if govobjconstraints:
+        if "heuristic_relation" not in lexe:
+            return None
+        govobj = lexe["heuristic_relation"]
+        for fld, matchX in govobjconstraints:
+            if '.' in fld:
+                assert fld.startswith('g.') or fld.startswith('o.')
+                i = govobj["gov"] if fld.startswith('g.') else govobj["obj"]
+                if i is None:
+                    if matchX:
+                        return None
+                    else:
+                        go = {'': ''}
+                        f = ''
+                else:
+                    go = sent["toks"][i-1]
+                    f = fld.split('.',1)[1]
+            else:
+                go = govobj
+                f = fld
+
+            if matchX and not _check(cache, fld, matchX, go[f]):
+                return None
+            if matchX is None:
+                myprints[fld] = go[f]
+    if tknconstraints:
+        toks = [sent["toks"][i-1] for i in lexe["toknums"]]
+        for fld, matchX in tknconstraints:
+            combined = tuple(tok[fld] for tok in toks)
+            if len(combined)==1:
+                combined = combined[0]
+            # combined is a tuple if this is a multi-token expression,
+            # and just a single field value otherwise
+            if matchX and not _check(cache, fld, matchX, str(combined)):
+                return None
+            if matchX is None:
+                myprints[fld] = combined
+
+    myprints['_sentid'] = sent["sent_id"]
+
+    # the remaining columns are only formatted if they will be printed
+    toknums = lexe["toknums"]
+    if '_context' in fields:
+        myprints['_context'] = _context(sent, toknums, sentcache)
+
+    if '_tokoffset' in fields:
+        myprints['_tokoffset'] = tokoffset(toknums)
+
+    return myprints
+
+def _iter_lexes(jsonPath, minlen, maxlen):
     with open(jsonPath, encoding='utf-8') as inF:
         data = json.load(inF)
 
     for sent in data:
         if not minlen <= len(sent["toks"]) <= maxlen:
             continue
+        sentcache = {}
         for lexe in chain(sent["swes"].values(), sent["smwes"].values()):
-            fail = False
-            myprints = {k: None for k in fields}
-            # at the lexical expression level: lexcat, lexlemma, ss (role), ss2 (function), heuristic_relation["govlemma", "objlemma", "config"]
-            for fld, matchX in lexconstraints:
-                if matchX and not matchX(lexe[fld]):
-                    fail = True
-                    break
-                if matchX is None:
-                    myprints[fld] = lexe[fld]
-            if govobjconstraints and not fail:
-                if "heuristic_relation" not in lexe:
-                    fail = True
-                else:
-                    govobj = lexe["heuristic_relation"]
-                    for fld, matchX in govobjconstraints:
-                        if '.' in fld:
-                            assert fld.startswith('g.') or fld.startswith('o.')
-                            i = govobj["gov"] if fld.startswith('g.') else govobj["obj"]
-                            if i is None:
-                                if matchX:
-                                    fail = True
-                                    break
-                                else:
-                                    go = {'': ''}
-                                    f = ''
-                            else:
-                                go = sent["toks"][i-1]
-                                f = fld.split('.',1)[1]
-                        else:
-                            go = govobj
-                            f = fld
-
-                        if matchX and not matchX(go[f]):
-                            fail = True
-                            break
-                        if matchX is None:
-                            myprints[fld] = go[f]
-            if tknconstraints and not fail:
-                toks = [sent["toks"][i-1] for i in lexe["toknums"]]
-                for fld, matchX in tknconstraints:
-                    combined = tuple(tok[fld] for tok in toks)
-                    if len(combined)==1:
-                        combined = combined[0]
-                    # combined is a tuple if this is a multi-token expression,
-                    # and just a single field value otherwise
-                    if matchX and not matchX(str(combined)):
-                        fail = True
-                        break
-                    if matchX is None:
-                        myprints[fld] = combined
-
-            if not fail:
-                myprints['_sentid'] = sent["sent_id"]
-
-                s = ''
-                inmatch = False
-                toknums = lexe["toknums"]
-                for tok in sent["toks"]:
-                    if tok["#"] in toknums:
-                        if not inmatch:
-                            inmatch = True
-                            s += '>> '
-                    else:
-                        if inmatch:
-                            inmatch = False
-                            s += '<< '
-                    s += tok["word"] + ' '
-                if inmatch:
-                    s += '<< '
-                myprints['_context'] = s
-
-                if 1 < len(toknums) == max(toknums)-min(toknums)+1:
-                    myprints['_tokoffset'] = f'{min(toknums)}-{max(toknums)}'
-                else:
-                    myprints['_tokoffset'] = ','.join(map(str,lexe["toknums"]))
-
-                yield myprints
-
+            yield sent, lexe, sentcache
 
+def tselect(jsonPath, fields, tknconstraints=[], lexconstraints=[], govobjconstraints=[], minlen=0, maxlen=float('inf')):
+    """
+    Yield a dict for each lexical expression in the corpus satisfying the constraints,
+    with the values of the fields to be printed. The special fields '_context' and
+    '_tokoffset' are only computed if they are among `fields`.
+    """
+    for sent, lexe, sentcache in _iter_lexes(jsonPath, minlen, maxlen):
+        myprints = _select_lexe(sent, lexe, fields, tknconstraints, lexconstraints, govobjconstraints, sentcache=sentcache)
+        if myprints is not None:
+            yield myprints
+
+def tselect_batch(jsonPath, queries, minlen=0, maxlen=float('inf')):
+    """
+    Evaluate several queries in a single pass over the lexical expressions of the corpus.
+    `queries` is a list of (fields, tknconstraints, lexconstraints, govobjconstraints) tuples,
+    as for tselect(). Yields (query index, myprints) pairs in corpus order.
+    A constraint shared by several queries (e.g. lc==P, as built by compile_constraint())
+    is only evaluated once per lexical expression.
+    """
+    for sent, lexe, sentcache in _iter_lexes(jsonPath, minlen, maxlen):
+        cache = {}
+        for q, (fields, tknconstraints, lexconstraints, govobjconstraints) in enumerate(queries):
+            myprints = _select_lexe(sent, lexe, fields, tknconstraints, lexconstraints, govobjconstraints, cache, sentcache)
+            if myprints is not None:
+                yield q, myprints
+
+def _filters_only(tknconstraints, lexconstraints, govobjconstraints):
+    """Drop the dummy constraints that only request a field to be looked up for printing.
+    (For governor/object fields these are kept, as they require the
+    expression to have a heuristic_relation.)"""
+    return ([(fld, matchX) for fld, matchX in tknconstraints if matchX],
+            [(fld, matchX) for fld, matchX in lexconstraints if matchX],
+            govobjconstraints)
+
+def tcount(jsonPath, tknconstraints=[], lexconstraints=[], govobjconstraints=[], minlen=0, maxlen=float('inf')):
+    """Count the lexical expressions satisfying the constraints, without formatting any output."""
+    constraints = _filters_only(tknconstraints, lexconstraints, govobjconstraints)
+    return sum(1 for _ in tselect(jsonPath, [], *constraints, minlen=minlen, maxlen=maxlen))
+
+def tcount_batch(jsonPath, queries, minlen=0, maxlen=float('inf')):
+    """Like tcount(), but for several queries (see tselect_batch()). Returns a list of counts."""
+    queries = [([], *_filters_only(*constraints)) for fields, *constraints in queries]
+    ns = [0]*len(queries)
+    for q, _ in tselect_batch(jsonPath, queries, minlen=minlen, maxlen=maxlen):
+        ns[q] += 1
+    return ns
+
+def tally(rows, groupfields, nexamples=0, counts=None, examples=None):
+    """
+    Count rows (dicts yielded by tselect()) by their values of the fields in `groupfields`.
+    Up to `nexamples` distinct sentence IDs are also collected for each combination of values.
+    Pass `counts` and `examples` to continue a previous tally.
+    Returns (counts, examples), keyed by tuples of field values.
+    """
+    if counts is None:
+        counts = Counter()
+    if examples is None:
+        examples = defaultdict(list)
+    for myprints in rows:
+        k = tuple(myprints[fld] for fld in groupfields)
+        counts[k] += 1
+        if nexamples:
+            sentids = examples[k]
+            if len(sentids)<nexamples and myprints['_sentid'] not in sentids:
+                sentids.append(myprints['_sentid'])
+    return counts, examples
+
+def print_groups(counts, examples, groupfields, nexamples=0, header=True, file=None):
+    """Print a tally from tally() as a frequency table, most frequent first."""
+    if header:
+        print('# ' + '\t'.join(['count'] + groupfields + (['_examples'] if nexamples else [])), file=file)
+    for k, n in sorted(counts.items(), key=lambda item: (-item[1], str(item[0]))):
+        print(n, *k, *([','.join(examples[k])] if nexamples else []), sep='\t', file=file)
+
+def print_header(prints, sysCall, commitHash, file=None):
+    # for reproducibility, the git commit hash and the command line call to this script
+    print(f'# {commitHash} ~ {sysCall}', file=file)
+
+    # column headers
+    print('# ' + '\t'.join(prints), sep='\t', file=file)
+
+def print_row(myprints, prints, file=None):
+    print(*[myprints[f] for f in prints],
+          #lexe["ss"]+('|'+lexe["ss2"] if lexe["ss2"] and lexe["ss2"]!=lexe["ss"] else ''),     # TODO: make a field for this
+          sep='\t', file=file)
 
 
 
@@ -164,8 +374,13 @@ if __name__=='__main__':
     printHeader = True
     printSentId = True
     printTokOffset = True
+    printContext = True
+    countOnly = False
     lowerb = 0
     upperb = float('inf')
+    batchFP = None
+    groupBy = None
+    nExamples = 0
 
 
     args = sys.argv[1:]
@@ -181,6 +396,15 @@ if __name__=='__main__':
             printSentId = False
         elif flag=='-T':    # no token offsets
             printTokOffset = False
+        elif flag=='-C':    # no context
+            printContext = False
+        elif flag=='--count-only':
+            countOnly = True
+        elif flag=='--group-by':
+            groupBy = args.pop(0).split(',')
+        elif flag=='--examples':
+            nExamples = int(args.pop(0))
+            assert nExamples>=0
         elif flag=='-L':    # sentence length range
             v = args.pop(0)
             lowerb, upperb = v.split('..')
@@ -188,101 +412,107 @@ if __name__=='__main__':
             lowerb = int(lowerb)
             upperb = int(upperb) if upperb else float('inf')
             assert 0<lowerb<=upperb,f'-L {v} option is invalid'
+        elif flag=='-B':    # batch of queries
+            batchFP = args.pop(0)
         else:
             raise ValueError(f'Invalid flag: {flag}')
 
     inFP = args.pop(0)
-    tknconstraints, lexconstraints, govobjconstraints = [], [], []
-    prints = [] # fields whose values are to be printed
 
-    if printSentId:
-        prints.append('_sentid')
-    if printTokOffset:
-        prints.append('_tokoffset')
-
-    # parse the query (fields and constraints)
-    for arg in args:
-        printme = False
-        if arg.startswith('+'):
-            printme = True
-            arg = arg[1:]
-
-        if '=' in arg:
-            fld, pattern = arg.split('=', 1)
+    if groupBy:
+        # resolve field names, and the fields' values must be looked up
+        groupBy, *groupconstraints = parse_query(['+'+fld for fld in groupBy])
 
-            if fld.endswith('!'):
-                op = '!='
-                fld = fld[:-1]
-                if pattern.startswith('='):
-                    op += '='
-                    pattern = '^' + pattern[1:] + '$'
-                r = re.compile(pattern, RE_FLAGS)
-                matchX = (lambda r: lambda s: s is None or r.search(s) is None)(r)
-            elif pattern.startswith('='):
-                op = '=='
-                pattern = pattern[1:]
-                r = re.compile('^'+pattern+'$', RE_FLAGS)
-                matchX = (lambda r: lambda s: s is not None and r.search(s) is not None)(r)
-            else:
-                op = '='
-                r = re.compile(pattern, RE_FLAGS)
-                matchX = (lambda r: lambda s: s is not None and r.search(s) is not None)(r)
+    def full_prints(prints):
+        return (['_sentid'] if printSentId else []) \
+             + (['_tokoffset'] if printTokOffset else []) \
+             + prints + (['_context'] if printContext else [])
 
-            if '.' in fld:
-                prefix, fld = fld.split('.',1)
-                prefix += '.'   # g. (governor) or o. (object)
-            else:
-                prefix = ''
-            fld = ALL_FIELDS[fld]
-            fld = prefix+fld
-            if fld in TKN_LEVEL_FIELDS:
-                tknconstraints.append((fld, matchX))
-            elif fld in LEX_LEVEL_FIELDS:
-                lexconstraints.append((fld, matchX))
-            else:
-                govobjconstraints.append((fld, matchX))
-        else:
-            assert printme
-            fld = arg
-
-        if printme:
-            if '.' in fld:
-                prefix, fld = fld.split('.',1)
-                prefix += '.'   # g. (governor) or o. (object)
-            else:
-                prefix = ''
-            fld = ALL_FIELDS[fld]
-            fld = prefix+fld
-            if fld not in prints:
-                prints.append(fld)
-            # to the "constraints", add a dummy item indicate that the field should be looked up for printing
-            if fld in TKN_LEVEL_FIELDS:
-                tknconstraints.append((fld, None))
-            elif fld in LEX_LEVEL_FIELDS:
-                lexconstraints.append((fld, None))
-            else:
-                govobjconstraints.append((fld, None))
-
-    prints.append('_context')
-
-
-    if printHeader:
-        # for reproducibility, the git commit hash and the command line call to this script
+    if printHeader and not countOnly:
         commitHash = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD']).strip()
         sysCall = sys.argv[0] + " " + " ".join(map(shlex.quote, sys.argv[1:]))
-        print(f'# {commitHash} ~ {sysCall}')
 
-        # column headers
-        print('# ' + '\t'.join(prints), sep='\t')
-
-    n = 0
-    for myprints in tselect(inFP, prints, tknconstraints=tknconstraints,
-            lexconstraints=lexconstraints, govobjconstraints=govobjconstraints,
-            minlen=lowerb, maxlen=upperb):
-
-        print(*[myprints[f] for f in prints],
-              #lexe["ss"]+('|'+lexe["ss2"] if lexe["ss2"] and lexe["ss2"]!=lexe["ss"] else ''),     # TODO: make a field for this
-              sep='\t')
-        n += 1
-
-    print(f'{n} match' + ('es' if n!=1 else ''), file=sys.stderr)
+    if batchFP:
+        assert not args,'Query terms cannot be given on the command line in batch mode (-B)'
+        outFPs, queries, allprints = [], [], []
+        with open(batchFP, encoding='utf-8') as batchF:
+            for ln in batchF:
+                if not ln.strip() or ln.lstrip().startswith('#'):
+                    continue
+                outFP, *terms = shlex.split(ln)
+                assert terms,f'No query terms for {outFP}'
+                prints, tknconstraints, lexconstraints, govobjconstraints = parse_query(terms)
+                prints = full_prints(prints)
+                if groupBy:
+                    prints = groupBy
+                    tknconstraints, lexconstraints, govobjconstraints = [c1+c2 for c1,c2 in zip(
+                        (tknconstraints, lexconstraints, govobjconstraints), groupconstraints)]
+                outFPs.append(outFP)
+                allprints.append(prints)
+                queries.append((prints, tknconstraints, lexconstraints, govobjconstraints))
+
+        if countOnly:
+            for outFP, n in zip(outFPs, tcount_batch(inFP, queries, minlen=lowerb, maxlen=upperb)):
+                print(outFP, n, sep='\t')
+            sys.exit(0)
+
+        outFs = [open(outFP, 'w', encoding='utf-8') for outFP in outFPs]
+        try:
+            if printHeader:
+                for outF, prints, outFP in zip(outFs, allprints, outFPs):
+                    if groupBy: # print_groups() prints the column headers
+                        print(f'# {commitHash} ~ {sysCall} [{outFP}]', file=outF)
+                    else:
+                        print_header(prints, f'{sysCall} [{outFP}]', commitHash, file=outF)
+
+            ns = [0]*len(queries)
+            if groupBy:
+                tallies = [(Counter(), defaultdict(list)) for q in queries]
+            for q, myprints in tselect_batch(inFP, queries, minlen=lowerb, maxlen=upperb):
+                if groupBy:
+                    tally([myprints], groupBy, nExamples, *tallies[q])
+                else:
+                    print_row(myprints, allprints[q], file=outFs[q])
+                ns[q] += 1
+            if groupBy:
+                for outF, (counts, examples) in zip(outFs, tallies):
+                    print_groups(counts, examples, groupBy, nExamples, header=printHeader, file=outF)
+        finally:
+            for outF in outFs:
+                outF.close()
+
+        for outFP, n in zip(outFPs, ns):
+            print(f'{outFP}: {n} match' + ('es' if n!=1 else ''), file=sys.stderr)
+    else:
+        prints, tknconstraints, lexconstraints, govobjconstraints = parse_query(args)
+        prints = full_prints(prints)
+
+        if countOnly:
+            print(tcount(inFP, tknconstraints, lexconstraints, govobjconstraints, minlen=lowerb, maxlen=upperb))
+            sys.exit(0)
+
+        if groupBy:
+            tknconstraints, lexconstraints, govobjconstraints = [c1+c2 for c1,c2 in zip(
+                (tknconstraints, lexconstraints, govobjconstraints), groupconstraints)]
+            counts, examples = tally(tselect(inFP, groupBy, tknconstraints=tknconstraints,
+                lexconstraints=lexconstraints, govobjconstraints=govobjconstraints,
+                minlen=lowerb, maxlen=upperb), groupBy, nExamples)
+            if printHeader:
+                print(f'# {commitHash} ~ {sysCall}')
+            print_groups(counts, examples, groupBy, nExamples, header=printHeader)
+            n = sum(counts.values())
+            print(f'{n} match' + ('es' if n!=1 else '') + f' in {len(counts)} group' + ('s' if len(counts)!=1 else ''), file=sys.stderr)
+            sys.exit(0)
+
+        if printHeader:
+            print_header(prints, sysCall, commitHash)
+
+        n = 0
+        for myprints in tselect(inFP, prints, tknconstraints=tknconstraints,
+                lexconstraints=lexconstraints, govobjconstraints=govobjconstraints,
+                minlen=lowerb, maxlen=upperb):
+
+            print_row(myprints, prints)
+            n += 1
+
+        print(f'{n} match' + ('es' if n!=1 else ''), file=sys.stderr)
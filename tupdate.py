@@ -18,20 +18,26 @@ import sys, json, fileinput, re
 import shlex, subprocess
 from itertools import chain
 
-from conllulex2json import print_json
+from conllulex2json import print_json, print_sent_json
 from mwerender import makelabel
 from tquery import ALL_FIELDS, LEX_LEVEL_FIELDS
 
-def tupdate(jsonPath, fields, updates_table):
+def parse_tokoffset(tokOffset):
     """
-    Modify data associated with particular tokens in the corpus loaded from jsonPath,
-    and return the updated dict to be serialized to JSON.
-    `updates_table` must contain "_sentid" and "_tokoffset" for all records.
-    At present, only the fields "ss", "ss2", and "lexcat" are eligible for modification;
-    other fields present in `updates` will be checked to ensure there is no change
-    (unknown fields will trigger a warning).
+    Inverse of tquery.tokoffset(): the tuple of token numbers described by a string
+    like '3', '8-9' (contiguous range), or '7,9'.
     """
+    if '-' in tokOffset:
+        i, j = map(int, tokOffset.split('-'))
+        return tuple(range(i, j+1))
+    return tuple(map(int, tokOffset.split(',')))
 
+def _index_updates(fields, updates_table):
+    """
+    Validate the fields and index the update records by sentence ID and token numbers.
+    Returns (updates, ignores), where `updates` maps sentId -> toknums tuple -> field -> value
+    and `ignores` lists fields that do not need to be applied.
+    """
     assert '_sentid' in fields
     assert '_tokoffset' in fields
     ignores = []
@@ -47,7 +53,7 @@ def tupdate(jsonPath, fields, updates_table):
     if '_context' in fields:
         ignores.append('_context')
 
-    # updates: sentId -> tokOffset -> field -> value
+    # updates: sentId -> toknums -> field -> value
     updates = {}
     for record in updates_table:
         sentId = record.pop('_sentid')
@@ -56,52 +62,134 @@ def tupdate(jsonPath, fields, updates_table):
         assert tokOffset
         if sentId not in updates:
             updates[sentId] = {}
-        assert tokOffset not in updates[sentId],f'Cannot have multiple updates to the same token: {sentId}:{tokOffset}'
-        updates[sentId][tokOffset] = {**record}
+        toknums = parse_tokoffset(tokOffset)
+        assert toknums not in updates[sentId],f'Cannot have multiple updates to the same token: {sentId}:{tokOffset}'
+        updates[sentId][toknums] = {**record}
+
+    return updates, ignores
+
+def _update_sent(sent, sentupdates, ignores):
+    """Apply the updates for one sentence (toknums -> field -> value), looking up
+    each affected lexical expression directly by its token numbers."""
+    smwes = None
+    for toknums, record in sentupdates.items():
+        if len(toknums)==1:
+            lexe = sent["swes"].get(str(toknums[0]))
+        else:
+            if smwes is None:
+                smwes = {tuple(e["toknums"]): e for e in sent["smwes"].values()}
+            lexe = smwes.get(toknums)
+        if lexe is None:
+            continue
+
+        changed = False
+        for k,v in record.items():
+            if v == '':
+                v = None
+            if k in ignores:
+                continue
+            elif k in ('ss', 'ss2', 'lexcat'):
+                # update value!
+                if lexe[LEX_LEVEL_FIELDS[k]] != v:
+                    changed = True
+                lexe[LEX_LEVEL_FIELDS[k]] = v
+            else:   # locked field: confirm value hasn't changed
+                assert lexe[LEX_LEVEL_FIELDS[k]]==v,f'Changes to this field not currently supported: {k!r}={v!r} in {sent["sent_id"]}:{toknums}'
+
+        if changed:
+            # now we need to update the lextag(s) for consistency
+            # we assume the MWE part hasn't changed
+
+            lexcat_ss = makelabel(lexe).replace(':', '|')
+
+            # get the first token of the lexical expression, whose lextag
+            # encodes supersense and lexcat info
+            tok1 = sent["toks"][toknums[0]-1]
+            fulllextag = tok1['lextag']
+            mwepart = fulllextag[:fulllextag.index('-')]
+            fulllextag = f'{mwepart}-{lexcat_ss}'
+            tok1['lextag'] = fulllextag
+
+def tupdate(jsonPath, fields, updates_table):
+    """
+    Modify data associated with particular tokens in the corpus loaded from jsonPath,
+    and return the updated dict to be serialized to JSON.
+    `updates_table` must contain "_sentid" and "_tokoffset" for all records.
+    At present, only the fields "ss", "ss2", and "lexcat" are eligible for modification;
+    other fields present in `updates` will be checked to ensure there is no change
+    (unknown fields will trigger a warning).
+    """
+    updates, ignores = _index_updates(fields, updates_table)
 
     with open(jsonPath, encoding='utf-8') as inF:
         data = json.load(inF)
 
     for sent in data:
-        if sent["sent_id"] not in updates:
-            continue
-        for lexe in chain(sent["swes"].values(), sent["smwes"].values()):
-            toknums = lexe["toknums"]
-            if 1 < len(toknums) == max(toknums)-min(toknums)+1:
-                _tokoffset = f'{min(toknums)}-{max(toknums)}'
-            else:
-                _tokoffset = ','.join(map(str,lexe["toknums"]))
-
-            changed = False
-            for k,v in updates[sent["sent_id"]].get(_tokoffset, {}).items():
-                if v == '':
-                    v = None
-                if k in ignores:
-                    continue
-                elif k in ('ss', 'ss2', 'lexcat'):
-                    # update value!
-                    if lexe[LEX_LEVEL_FIELDS[k]] != v:
-                        changed = True
-                    lexe[LEX_LEVEL_FIELDS[k]] = v
-                else:   # locked field: confirm value hasn't changed
-                    assert lexe[LEX_LEVEL_FIELDS[k]]==v,f'Changes to this field not currently supported: {k!r}={v!r} in {sentId}:{tokOffset}'
-
-            if changed:
-                # now we need to update the lextag(s) for consistency
-                # we assume the MWE part hasn't changed
-
-                lexcat_ss = makelabel(lexe).replace(':', '|')
-
-                # get the first token of the lexical expression, whose lextag
-                # encodes supersense and lexcat info
-                tok1 = sent["toks"][toknums[0]-1]
-                fulllextag = tok1['lextag']
-                mwepart = fulllextag[:fulllextag.index('-')]
-                fulllextag = f'{mwepart}-{lexcat_ss}'
-                tok1['lextag'] = fulllextag
+        if sent["sent_id"] in updates:
+            _update_sent(sent, updates[sent["sent_id"]], ignores)
 
     return data
 
+def _sent_chunks(inF):
+    """
+    Given a JSON file in the layout written by conllulex2json.print_json(),
+    iterate over (sentence ID, raw JSON text) pairs without decoding the sentences.
+    Yields nothing if the file is not laid out that way (e.g. it was written by json.dump()).
+    """
+    if next(inF, None)!='[\n':
+        return
+    lines = []
+    first = True
+    for ln in inF:
+        if not lines and ln!='{\n':
+            if first:
+                return
+            raise ValueError(f'Unexpected line in JSON: {ln!r}')
+        first = False
+        lines.append(ln)
+        if ln in ('},\n', '}]\n', '}]'):   # end of sentence (and of file, in the latter cases)
+            # the metadata precedes the token list
+            for mln in lines:
+                if mln.startswith(' "sent_id": '):
+                    sentId = json.loads('{' + mln.rstrip().rstrip(',') + '}')["sent_id"]
+                    break
+                assert not mln.startswith('    "toks": '),lines[:5]
+            lines[-1] = '}'
+            yield sentId, ''.join(lines)
+            lines = []
+
+def tupdate_stream(jsonPath, fields, updates_table, outF=None):
+    """
+    Like tupdate(), but writes the updated corpus as JSON to `outF` (default: stdout).
+    If the input is in the layout written by conllulex2json.print_json(), sentences
+    without updates are copied through without being decoded.
+    """
+    updates, ignores = _index_updates(fields, updates_table)
+
+    with open(jsonPath, encoding='utf-8') as inF:
+        chunks = _sent_chunks(inF)
+        first = next(chunks, None)
+        if first is None:   # other layout: decode everything
+            inF.seek(0)
+            data = json.load(inF)
+            for sent in data:
+                if sent["sent_id"] in updates:
+                    _update_sent(sent, updates[sent["sent_id"]], ignores)
+            print_json(data, file=outF)
+            return
+
+        print('[', file=outF)
+        for i,(sentId,chunk) in enumerate(chain([first], chunks)):
+            if i>0:
+                print(',', file=outF)
+            if sentId in updates:
+                sent = json.loads(chunk)
+                _update_sent(sent, updates[sentId], ignores)
+                print_sent_json(sent, file=outF)
+            else:
+                print(chunk, end='', file=outF)
+        print(']', file=outF)
+
 
 if __name__=='__main__':
 
@@ -126,8 +214,6 @@ if __name__=='__main__':
             del record['']  # ignore header-less columns
         table.append(record)
 
-    updated = tupdate(jsonFP, fields, table)
-
-    print_json(updated)
+    tupdate_stream(jsonFP, fields, table)
 
     print(f'{len(rows)} update rows processed', file=sys.stderr)